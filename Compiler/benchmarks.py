@@ -0,0 +1,674 @@
+import os
+import sys
+import time
+
+# Benchmarks for the compiler itself. Usage: python benchmarks.py <name> [options]
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import compiler
+
+
+def benchSymbols(args):
+    """Symbol table lookups per second and memory at 1M symbols"""
+    import random
+    import tracemalloc
+
+    count = int(compiler.getArgValue(args, "-n", 1000000))
+    scopes = 1000
+    names = [f"var{i}" for i in range(count)]
+
+    def build():
+        table = compiler.SymbolTable()
+        for i, name in enumerate(names):
+            if i % (count // scopes or 1) == 0:
+                table.pushScope()
+            table.declare(name, "int")
+        return table
+
+    start = time.perf_counter()
+    table = build()
+    declareTime = time.perf_counter() - start
+
+    tracemalloc.start()
+    measured = build()  # keep it alive while reading the traced size
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del measured
+
+    # Look names up through freshly built strings, as the translator does with tokens
+    probes = [f"var{random.randrange(count)}" for _ in range(count)]
+    start = time.perf_counter()
+    for name in probes:
+        table.lookup(name)
+    lookupTime = time.perf_counter() - start
+
+    print(f"[Info] {count} symbols in {len(table.scopes)} scopes")
+    print(f"    declare  {count / declareTime:,.0f} symbols/s")
+    print(f"    lookup   {count / lookupTime:,.0f} lookups/s")
+    print(f"    memory   {current / count:.0f} bytes/symbol ({current / 1024 / 1024:.1f} MB)")
+
+
+FOLD_HEADER = """import stdio
+import stdlib
+import math
+import string
+"""
+
+FOLD_TEMPLATE = """
+fn is_windows{n}() -> int {{
+    #ifdef _WIN32
+        return 1
+    #else
+        return 0
+    #endif
+}}
+
+fn work{n}(x: int) -> int {{
+    let size: int = 64 * 1024 / 8
+    let mask: int = (1 << 12) - 1
+    let scale: double = 2.0 * 3.14159 / 360.0
+    let limit: int = size * 4 + mask % 7
+    #if defined(__linux__) || defined(__APPLE__)
+    let pageSize: int = 4096
+    #else
+    let pageSize: int = 65536
+    #endif
+    if (0) {{
+        printf("debug: size=%d mask=%d\\n", size, mask)
+        printf("debug: scale=%f\\n", scale)
+        printf("debug: limit=%d page=%d\\n", limit, pageSize)
+    }}
+    if (1 + 1 == 2) {{
+        return x * size + limit + pageSize
+    }} else {{
+        return 0
+    }}
+}}
+"""
+
+def benchFold(args):
+    """C output size and gcc -O0 time with and without the optimisation pass"""
+    import subprocess
+    import tempfile
+
+    count = int(compiler.getArgValue(args, "-n", 200))
+
+    with tempfile.TemporaryDirectory() as workDir:
+        sources = []
+        for n in range(count):
+            path = os.path.join(workDir, f"case{n}.cpx")
+            with open(path, "w") as f:
+                f.write(FOLD_HEADER + "".join(FOLD_TEMPLATE.format(n=f"{n}_{k}") for k in range(20)))
+            sources.append(path)
+
+        results = {}
+        for label, optimize in [("plain", False), ("folded", True)]:
+            size = 0
+            gccTime = 0.0
+            for path in sources:
+                cPath = path[:-3] + "c"
+                compiler.translateFile(path, cPath, optimize=optimize)
+                size += os.path.getsize(cPath)
+                start = time.perf_counter()
+                subprocess.run(["gcc", "-O0", "-c", cPath, "-o", cPath[:-2] + ".o"], check=True)
+                gccTime += time.perf_counter() - start
+            results[label] = (size, gccTime)
+
+    plainSize, plainTime = results["plain"]
+    foldedSize, foldedTime = results["folded"]
+    print(f"[Info] {count} files")
+    print(f"    C output  {plainSize / 1024:.0f} KB -> {foldedSize / 1024:.0f} KB "
+          f"({(plainSize - foldedSize) / plainSize * 100:.1f}% smaller)")
+    print(f"    gcc -O0   {plainTime:.2f}s -> {foldedTime:.2f}s "
+          f"({(plainTime - foldedTime) / plainTime * 100:.1f}% faster)")
+
+
+STRINGS_CPX = """import stdio
+
+fn main() -> int {{
+    let total: int; long = 0
+    let round: int = 0
+    let piece: string = "abcdefghij"
+    while (round < {rounds}) {{
+        let text: string
+        let i: int = 0
+        while (i < {appends}) {{
+            cp_str_append(&text, piece)
+            total += text.len
+            i += 1
+        }}
+        cp_str_free(&text)
+        round += 1
+    }}
+    print(total)
+    return 0
+}}
+"""
+
+# What the char-array lowering of the same program has to do: strcat and strlen rescan the buffer
+STRINGS_C = """#include <stdio.h>
+#include <string.h>
+
+int main() {{
+    long total = 0;
+    int round = 0;
+    char piece[] = "abcdefghij";
+    static char text[{appends} * 10 + 1];
+    while (round < {rounds}) {{
+        text[0] = '\\0';
+        int i = 0;
+        while (i < {appends}) {{
+            strcat(text, piece);
+            total += strlen(text);
+            i += 1;
+        }}
+        round += 1;
+    }}
+    printf("%ld\\n", total);
+    return 0;
+}}
+"""
+
+def benchStrings(args):
+    """cp_string runtime against the char-array lowering on an append/length heavy program"""
+    import subprocess
+    import tempfile
+
+    appends = int(compiler.getArgValue(args, "-n", 5000))
+    rounds = int(compiler.getArgValue(args, "--rounds", 20))
+
+    with tempfile.TemporaryDirectory() as workDir:
+        cpxPath = os.path.join(workDir, "runtime.cpx")
+        with open(cpxPath, "w") as f:
+            f.write(STRINGS_CPX.format(appends=appends, rounds=rounds))
+        compiler.translateFile(cpxPath, cpxPath[:-3] + "c")
+
+        charPath = os.path.join(workDir, "chararray.c")
+        with open(charPath, "w") as f:
+            f.write(STRINGS_C.format(appends=appends, rounds=rounds))
+
+        timings = {}
+        for label, cPath in [("char[]", charPath), ("cp_string", cpxPath[:-3] + "c")]:
+            exePath = cPath[:-2]
+            subprocess.run(["gcc", cPath, "-o", exePath] + compiler.gccFlags(["-O2"]), check=True)
+            start = time.perf_counter()
+            output = subprocess.run([exePath], capture_output=True, text=True, check=True).stdout
+            timings[label] = (time.perf_counter() - start, output.strip())
+
+    print(f"[Info] {rounds} rounds of {appends} appends + length queries")
+    for label, (elapsed, output) in timings.items():
+        print(f"    {label:<10} {elapsed:.4f}s  (result {output})")
+    print(f"    speedup    {timings['char[]'][0] / timings['cp_string'][0]:.1f}x")
+
+
+ARRAYS_CPX = """import stdio
+
+let data: int[{size}]
+
+fn main() -> int {{
+    let i: int = 0
+    let round: int = 0
+    let total: int; long = 0
+    while (round < {rounds}) {{
+        for (i = 0; i < {size}; i++) {{
+            data[i] = data[i] + i
+            total += data[(i * 7) % {size}]
+        }}
+        round += 1
+    }}
+    print(total)
+    return 0
+}}
+"""
+
+def benchArrays(args):
+    """Array loops built in release mode (no checks) and checked mode (--checked)"""
+    import subprocess
+    import tempfile
+
+    size = int(compiler.getArgValue(args, "-n", 1000000))
+    rounds = int(compiler.getArgValue(args, "--rounds", 100))
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as workDir:
+        for label, checked in [("release", False), ("checked", True)]:
+            cpxPath = os.path.join(workDir, f"{label}.cpx")
+            with open(cpxPath, "w") as f:
+                f.write(ARRAYS_CPX.format(size=size, rounds=rounds))
+            compiler.translateFile(cpxPath, cpxPath[:-3] + "c", checked=checked)
+
+            exePath = cpxPath[:-4]
+            subprocess.run(["gcc", cpxPath[:-3] + "c", "-o", exePath] + compiler.gccFlags(["-O2"]), check=True)
+            start = time.perf_counter()
+            output = subprocess.run([exePath], capture_output=True, text=True, check=True).stdout
+            timings[label] = (time.perf_counter() - start, output.strip())
+
+    print(f"[Info] {rounds} passes over int[{size}]")
+    for label, (elapsed, output) in timings.items():
+        print(f"    {label:<8} {elapsed:.4f}s  (result {output})")
+    print(f"    checks cost {(timings['checked'][0] / timings['release'][0] - 1) * 100:.1f}%")
+
+
+STRUCTS_CPX = """import stdio
+
+struct {mode}Particle {{
+    alive: char
+    x: double
+    kind: char
+    y: double
+    flags: char
+    mass: float
+    group: short
+}}
+
+let particles: Particle[{count}]
+
+fn main() -> int {{
+    let i: int = 0
+    let round: int = 0
+    let total: double = 0
+    for (i = 0; i < {count}; i++) {{
+        particles[i].x = i
+        particles[i].mass = 1
+        particles[i].alive = i % 2
+    }}
+    while (round < {rounds}) {{
+        for (i = 0; i < {count}; i++) {{
+            if (particles[i].alive) {{
+                total += particles[i].x * particles[i].mass
+            }}
+        }}
+        round += 1
+    }}
+    printf("%zu %f\\n", sizeof(Particle), total)
+    return 0
+}}
+"""
+
+def benchStructs(args):
+    """Array-of-records traversal with reordered fields against declaration order"""
+    import subprocess
+    import tempfile
+
+    count = int(compiler.getArgValue(args, "-n", 2000000))
+    rounds = int(compiler.getArgValue(args, "--rounds", 50))
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as workDir:
+        for label, mode in [("ordered", "ordered "), ("reordered", "")]:
+            cpxPath = os.path.join(workDir, f"{label}.cpx")
+            with open(cpxPath, "w") as f:
+                f.write(STRUCTS_CPX.format(mode=mode, count=count, rounds=rounds))
+            compiler.translateFile(cpxPath, cpxPath[:-3] + "c")
+
+            exePath = cpxPath[:-4]
+            subprocess.run(["gcc", cpxPath[:-3] + "c", "-o", exePath] + compiler.gccFlags(["-O2"]), check=True)
+            start = time.perf_counter()
+            output = subprocess.run([exePath], capture_output=True, text=True, check=True).stdout.split()
+            timings[label] = (time.perf_counter() - start, int(output[0]))
+
+    print(f"[Info] {rounds} passes over {count} records")
+    for label, (elapsed, size) in timings.items():
+        print(f"    {label:<10} {size} bytes/record, {size * count / 1024 / 1024:.1f} MB, {elapsed:.4f}s")
+
+
+QUALIFIERS_CPX = """import stdio
+
+let xs: float[{size}]
+let ys: float[{size}]
+
+fn axpy(dst: *float{restrict}, src: *float; const{restrict}, factor: *float; const{restrict}, n: int) {{
+    let i: int = 0
+    for (i = 0; i < n; i++) {{
+        dst[i] = dst[i] * 0.5 + *factor * src[i]
+    }}
+}}
+
+fn main() -> int {{
+    let i: int = 0
+    let round: int = 0
+    let factor: float = 1.5
+    for (i = 0; i < {size}; i++) {{
+        xs[i] = i % 100
+    }}
+    while (round < {rounds}) {{
+        axpy(ys, xs, &factor, {size})
+        round += 1
+    }}
+    printf("%f\\n", ys[{size} - 1])
+    return 0
+}}
+"""
+
+def benchQualifiers(args):
+    """Vectorisable loop with restrict pointer parameters against plain pointers"""
+    import subprocess
+    import tempfile
+
+    size = int(compiler.getArgValue(args, "-n", 4096))
+    rounds = int(compiler.getArgValue(args, "--rounds", 200000))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workDir:
+        for label, qualifier in [("plain", ""), ("restrict", "; restrict")]:
+            cpxPath = os.path.join(workDir, f"{label}.cpx")
+            with open(cpxPath, "w") as f:
+                f.write(QUALIFIERS_CPX.format(size=size, rounds=rounds, restrict=qualifier))
+            compiler.translateFile(cpxPath, cpxPath[:-3] + "c")
+
+            # gcc reports the vectorised loops and the ones it had to version with a runtime alias check
+            exePath = cpxPath[:-4]
+            report = subprocess.run(["gcc", cpxPath[:-3] + "c", "-o", exePath, "-fopt-info-vec-optimized"]
+                                    + compiler.gccFlags(["-O3"]), capture_output=True, text=True, check=True).stderr
+            versioned = report.count("versioned for vectorization")
+            start = time.perf_counter()
+            output = subprocess.run([exePath], capture_output=True, text=True, check=True).stdout
+            results[label] = (time.perf_counter() - start, versioned, output.strip())
+
+    print(f"[Info] {rounds} axpy calls over float[{size}] at -O3")
+    for label, (elapsed, versioned, output) in results.items():
+        print(f"    {label:<9} {elapsed:.4f}s  {versioned} alias-checked loop(s)  (result {output})")
+    print(f"    speedup   {results['plain'][0] / results['restrict'][0]:.2f}x")
+
+
+LOOPS_CPX = """import stdio
+
+let grid: int[{size}][{size}]
+
+fn main() -> int {{
+    let total: int; long = 0
+    for round in 0..{rounds} {{
+        for row in 0..{size} {{
+            for col in 0..{size} {{
+                grid[row][col] += row ^ col
+            }}
+        }}
+        for row in reverse 0..{size} {{
+            for col in 0..{size} step 2 {{
+                total += grid[row][col]
+            }}
+        }}
+        for col in reverse 0..{size} step 3 {{
+            total -= grid[col][col]
+        }}
+    }}
+    printf("%ld\\n", total)
+    return 0
+}}
+"""
+
+# The same kernels written by hand
+LOOPS_C = """#include <stdio.h>
+
+int grid[{size}][{size}];
+
+int main() {{
+    long total = 0;
+    for (int round = 0; round < {rounds}; round++) {{
+        for (int row = 0; row < {size}; row++) {{
+            for (int col = 0; col < {size}; col++) {{
+                grid[row][col] += row ^ col;
+            }}
+        }}
+        for (int row = {size} - 1; row >= 0; row--) {{
+            for (int col = 0; col < {size}; col += 2) {{
+                total += grid[row][col];
+            }}
+        }}
+        for (int col = {size} - 1; col >= 0; col -= 3) {{
+            total -= grid[col][col];
+        }}
+    }}
+    printf("%ld\\n", total);
+    return 0;
+}}
+"""
+
+def benchLoops(args):
+    """Range loops against the same counted loops written in C"""
+    import subprocess
+    import tempfile
+
+    size = int(compiler.getArgValue(args, "-n", 1024))
+    rounds = int(compiler.getArgValue(args, "--rounds", 200))
+    repeats = int(compiler.getArgValue(args, "--repeat", 5))
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as workDir:
+        cpxPath = os.path.join(workDir, "ranges.cpx")
+        with open(cpxPath, "w") as f:
+            f.write(LOOPS_CPX.format(size=size, rounds=rounds))
+        compiler.translateFile(cpxPath, cpxPath[:-3] + "c")
+
+        handPath = os.path.join(workDir, "hand.c")
+        with open(handPath, "w") as f:
+            f.write(LOOPS_C.format(size=size, rounds=rounds))
+
+        for label, cPath in [("hand C", handPath), ("range", cpxPath[:-3] + "c")]:
+            exePath = cPath[:-2]
+            subprocess.run(["gcc", cPath, "-o", exePath] + compiler.gccFlags(["-O2"]), check=True)
+            best = None
+            for _ in range(repeats):
+                start = time.perf_counter()
+                output = subprocess.run([exePath], capture_output=True, text=True, check=True).stdout
+                elapsed = time.perf_counter() - start
+                best = elapsed if best is None else min(best, elapsed)
+            timings[label] = (best, output.strip())
+
+    print(f"[Info] {rounds} rounds over int[{size}][{size}], best of {repeats}")
+    for label, (elapsed, output) in timings.items():
+        print(f"    {label:<7} {elapsed:.4f}s  (result {output})")
+    print(f"    ratio   {timings['range'][0] / timings['hand C'][0]:.2f}x")
+
+
+FARM_UNIT = """fn unit{index}(n: int) -> int {{
+    let total: int = 0
+{body}    return total
+}}
+"""
+
+
+def benchFarm(args):
+    """Multi-file build with local gcc only against build workers started on this machine"""
+    import subprocess
+    import tempfile
+    import buildfarm
+
+    units = int(compiler.getArgValue(args, "-n", 16))
+    size = int(compiler.getArgValue(args, "--lines", 150))
+    workers = int(compiler.getArgValue(args, "--workers", os.cpu_count() or 1))
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as workDir:
+        cPaths = []
+        for i in range(units):
+            body = "".join(f"    for i{j} in 0..n {{\n        total += i{j} * {j} % (n + {j})\n    }}\n" for j in range(size))
+            cpxPath = os.path.join(workDir, f"unit{i}.cpx")
+            with open(cpxPath, "w") as f:
+                f.write(FARM_UNIT.format(index=i, body=body))
+            cPaths.append(cpxPath[:-3] + "c")
+            compiler.translateFile(cpxPath, cPaths[-1])
+
+        mainPath = os.path.join(workDir, "main.c")
+        with open(mainPath, "w") as f:
+            f.write("#include <stdio.h>\n" + "".join(f"int unit{i}(int n);\n" for i in range(units)))
+            f.write("int main(void) {\n    long total = 0;\n")
+            f.write("".join(f"    total += unit{i}(7);\n" for i in range(units)))
+            f.write('    printf("%ld\\n", total);\n    return 0;\n}\n')
+        cPaths.append(mainPath)
+
+        for label, local, spawned in [("local gcc", 1, 0), (f"{workers} workers", 0, workers)]:
+            exePath = os.path.join(workDir, label.replace(" ", "_"))
+            with buildfarm.localWorkers(spawned) as addresses:
+                start = time.perf_counter()
+                buildfarm.buildProgram(cPaths, exePath, ["-O2", "--local-jobs", str(local)], addresses)
+                elapsed = time.perf_counter() - start
+            output = subprocess.run([exePath], capture_output=True, text=True, check=True).stdout
+            timings[label] = (elapsed, output.strip())
+
+    print(f"[Info] {units + 1} files, {units} of them with {size} loops, built at -O2 on {os.cpu_count()} CPUs")
+    for label, (elapsed, output) in timings.items():
+        print(f"    {label:<12} {elapsed:.2f}s  (result {output})")
+    (serial, _), (farm, _) = timings.values()
+    print(f"    speedup      {serial / farm:.2f}x")
+
+
+def benchStartup(args):
+    """Start-up time of cpx -v and translate-only cpx -c, from compiler.py and from the cpx.pyz bundle"""
+    import subprocess
+    import tempfile
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "setup"))
+    import setup
+
+    runs = int(compiler.getArgValue(args, "-n", 20))
+    budget = float(compiler.getArgValue(args, "--budget-ms", 35)) / 1000
+    testPath = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "Tests", "test.cpx")
+
+    def measure(command, workDir):
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            subprocess.run(command, cwd=workDir, stdout=subprocess.DEVNULL, check=True)
+            times.append(time.perf_counter() - start)
+        return times
+
+    with tempfile.TemporaryDirectory() as workDir:
+        bundlePath = os.path.join(workDir, "cpx.pyz")
+        setup.createBundle(bundlePath)
+        cpxPath = os.path.join(workDir, "test.cpx")
+        with open(testPath, "r") as source, open(cpxPath, "w") as f:
+            f.write(source.read())
+
+        script = os.path.abspath(compiler.__file__)
+        cases = [
+            ("python -c pass", [sys.executable, "-c", "pass"], False),
+            ("compiler.py -v", [sys.executable, script, "-v"], False),
+            ("cpx.pyz -v", [sys.executable, bundlePath, "-v"], True),
+            ("compiler.py -c", [sys.executable, script, cpxPath, "-c"], False),
+            ("cpx.pyz -c", [sys.executable, bundlePath, cpxPath, "-c"], True),
+        ]
+        results = [(label, measure(command, workDir), budgeted) for label, command, budgeted in cases]
+
+    print(f"[Info] Median and p95 of {runs} runs, budget {budget * 1000:.0f} ms for the bundle")
+    overBudget = []
+    for label, times, budgeted in results:
+        median = compiler.percentile(times, 0.5)
+        print(f"    {label:<16} p50 {median * 1000:6.1f} ms   p95 {compiler.percentile(times, 0.95) * 1000:6.1f} ms")
+        if budgeted and median > budget:
+            overBudget.append(label)
+    if overBudget:
+        print(f"[Warning] Over the {budget * 1000:.0f} ms budget: {', '.join(overBudget)}")
+        sys.exit(1)
+
+
+def benchLsp(args):
+    """Keystroke-to-diagnostic latency of the language server (cpx lsp) on a large file"""
+    import json
+    import subprocess
+    import tempfile
+
+    functions = int(compiler.getArgValue(args, "-n", 350))
+    keystrokes = int(compiler.getArgValue(args, "--keys", 50))
+    source = FOLD_HEADER + "".join(FOLD_TEMPLATE.format(n=n) for n in range(functions))
+    lines = source.split("\n")
+
+    server = subprocess.Popen([sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), "compiler.py"), "lsp"],
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+
+    def send(message):
+        body = json.dumps(dict(message, jsonrpc="2.0")).encode("utf-8")
+        server.stdin.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+        server.stdin.flush()
+
+    def receive():
+        length = 0
+        while True:
+            header = server.stdout.readline().decode("ascii").strip()
+            if header == "":
+                break
+            if header.lower().startswith("content-length"):
+                length = int(header.split(":")[1])
+        return json.loads(server.stdout.read(length))
+
+    def diagnosed(version):
+        # Seconds until the translation diagnostics and then the gcc diagnostics for a version arrive
+        start = time.perf_counter()
+        times = []
+        while len(times) < 2:
+            message = receive()
+            if message.get("method") == "textDocument/publishDiagnostics" and message["params"]["version"] == version:
+                times.append(time.perf_counter() - start)
+        return times
+
+    with tempfile.TemporaryDirectory() as workDir:
+        path = os.path.join(workDir, "large.cpx")
+        with open(path, "w") as f:
+            f.write(source)
+        uri = "file://" + path
+        start = time.perf_counter()
+        compiler.translateFile(path, path[:-3] + "c")
+        fullTime = time.perf_counter() - start
+        stages = dict(compiler.diagnostics.timings)
+
+        send({"id": 1, "method": "initialize", "params": {}})
+        receive()
+        send({"method": "textDocument/didOpen",
+              "params": {"textDocument": {"uri": uri, "languageId": "cplus", "version": 1, "text": source}}})
+        openTimes = diagnosed(1)
+
+        # Type into a line in the middle of the file, one character per change
+        line = len(lines) // 2
+        while "let" not in lines[line]:
+            line += 1
+        column = len(lines[line])
+        results = []
+        for version in range(2, keystrokes + 2):
+            send({"method": "textDocument/didChange",
+                  "params": {"textDocument": {"uri": uri, "version": version},
+                             "contentChanges": [{"range": {"start": {"line": line, "character": column},
+                                                           "end": {"line": line, "character": column}},
+                                                 "text": "1"}]}})
+            column += 1
+            results.append(diagnosed(version))
+
+        send({"id": 2, "method": "shutdown"})
+        receive()
+        send({"method": "exit"})
+        server.wait()
+
+    translation = [times[0] for times in results]
+    gcc = [times[1] for times in results]
+    print(f"[Info] {len(lines)} lines, {keystrokes} keystrokes")
+    print(f"    full translation (cpx -c)  {fullTime * 1000:.0f} ms ("
+          + ", ".join(f"{stage} {seconds * 1000:.0f} ms" for stage, seconds in stages.items()) + ")")
+    print(f"    open                       {openTimes[0] * 1000:.0f} ms translation, {openTimes[1] * 1000:.0f} ms with gcc")
+    print(f"    translation diagnostics    p50 {compiler.percentile(translation, 0.5) * 1000:.1f} ms, "
+          f"p95 {compiler.percentile(translation, 0.95) * 1000:.1f} ms")
+    print(f"    gcc -fsyntax-only          p50 {compiler.percentile(gcc, 0.5) * 1000:.1f} ms, "
+          f"p95 {compiler.percentile(gcc, 0.95) * 1000:.1f} ms")
+
+
+BENCHMARKS = {
+    "symbols": benchSymbols,
+    "fold": benchFold,
+    "strings": benchStrings,
+    "arrays": benchArrays,
+    "structs": benchStructs,
+    "qualifiers": benchQualifiers,
+    "loops": benchLoops,
+    "farm": benchFarm,
+    "startup": benchStartup,
+    "lsp": benchLsp,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        print(f"[Error] Usage: python benchmarks.py <{'|'.join(BENCHMARKS)}> [options]")
+        sys.exit(1)
+
+    BENCHMARKS[sys.argv[1]](sys.argv[2:])
+
+
+if __name__ == "__main__":
+    main()
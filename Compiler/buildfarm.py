@@ -0,0 +1,423 @@
+import json
+import os
+import re
+import socket
+import socketserver
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+import compiler
+
+# Distributed gcc for "cpx build". Build workers ("cpx worker") compile C to object files for a coordinator,
+# which preprocesses every file itself (so workers need nothing but gcc) and links the objects locally.
+# A message is a 4-byte length, a JSON header and header["size"] bytes of payload:
+#   {"op": "hello"}                          -> {"version": 1, "slots": n}
+#   {"op": "compile", "flags": [...]} + C    -> {"ok": bool, "stderr": "..."} + object file
+# Jobs wait in one queue that every worker slot pulls from, so faster workers take more of them. A slot whose
+# worker can't be reached or drops the connection gives its job back; local slots and, failing that, a final
+# local pass compile whatever is left.
+
+PROTOCOL_VERSION = 1
+DEFAULT_PORT = 7734
+MAX_HEADER = 1 << 20
+
+# Flags a worker accepts: code generation and warnings only. -f values can't name files (no dots or slashes).
+ALLOWED_FLAGS = re.compile(r"-(O[0-3sz]?|Ofast|g[0-3]?|m[\w=.,+-]+|f[\w+-]+(?:=[\w,+-]+)?|W(?![alp],)[\w=+-]*|w|std=[\w+]+|pedantic)")
+# -f options that load code or write dumps, reports or profiles of their own
+FILE_FLAGS = re.compile(r"-f(?:no-)?(?:dump-|stack-usage|callgraph-info|profile|auto-profile|plugin|opt-info|"
+                        r"save-optimization-record|test-coverage|branch-probabilities)")
+
+
+def parseAddress(text):
+    # "host:port", "host" or "unix:/path/to/socket" -> (socket family, address)
+    if text.startswith("unix:"):
+        return socket.AF_UNIX, text[5:]
+    host, separator, port = text.rpartition(":")
+    if not separator:
+        return socket.AF_INET, (text, DEFAULT_PORT)
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+def sendMessage(sock, header, payload=b""):
+    data = json.dumps(dict(header, size=len(payload))).encode()
+    sock.sendall(struct.pack("!I", len(data)) + data + payload)
+
+def receiveExactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+def receiveMessage(sock):
+    # (header, payload) of the next message
+    (length,) = struct.unpack("!I", receiveExactly(sock, 4))
+    if length > MAX_HEADER:
+        raise ValueError(f"message header of {length} bytes")
+    header = json.loads(receiveExactly(sock, length))
+    return header, receiveExactly(sock, int(header.get("size", 0)))
+
+def splitFlags(flags):
+    # gcc flags -> (preprocessor flags, compile flags); include paths and macros only matter to the coordinator.
+    # The coordinator still preprocesses with every flag, since -O2, -mavx, -fopenmp and -std= define macros too.
+    preprocessFlags, compileFlags = [], []
+    i = 0
+    while i < len(flags):
+        flag = flags[i]
+        if flag in ["-I", "-D", "-U", "-include"] and i + 1 < len(flags):
+            preprocessFlags += flags[i:i + 2]
+            i += 2
+            continue
+        (preprocessFlags if flag[:2] in ["-I", "-D", "-U"] else compileFlags).append(flag)
+        i += 1
+    return preprocessFlags, compileFlags
+
+# ---------------- WORKER ----------------
+
+def allowedFlag(flag):
+    return ALLOWED_FLAGS.fullmatch(flag) is not None and FILE_FLAGS.match(flag) is None
+
+def compileObject(flags, source, gate):
+    # Compiles preprocessed C, returns (reply header, object file bytes).
+    # gcc runs in a scratch directory, so anything it writes next to its output is thrown away.
+    rejected = [flag for flag in flags if not allowedFlag(flag)]
+    if rejected:
+        return {"ok": False, "stderr": f"flags not allowed on a build worker: {' '.join(rejected)}"}, b""
+
+    with gate, tempfile.TemporaryDirectory(prefix="cpx-worker-") as workDir:
+        objectPath = os.path.join(workDir, "unit.o")
+        result = subprocess.run(["gcc", "-c", "-x", "cpp-output", "-", "-o", objectPath] + flags,
+                                input=source, capture_output=True, cwd=workDir)
+        stderr = result.stderr.decode(errors="replace")
+        if result.returncode != 0:
+            return {"ok": False, "stderr": stderr}, b""
+        with open(objectPath, "rb") as f:
+            return {"ok": True, "stderr": stderr}, f.read()
+
+
+class WorkerHandler(socketserver.BaseRequestHandler):
+    # One coordinator connection; it sends any number of requests, one at a time
+    def handle(self):
+        while True:
+            try:
+                header, payload = receiveMessage(self.request)
+            except (OSError, ValueError):
+                return
+
+            op = header.get("op")
+            if op == "hello":
+                sendMessage(self.request, {"version": PROTOCOL_VERSION, "slots": self.server.slots})
+            elif op == "compile":
+                reply, objectFile = compileObject(list(header.get("flags", [])), payload, self.server.gate)
+                sendMessage(self.request, reply, objectFile)
+            else:
+                sendMessage(self.request, {"ok": False, "stderr": f"unknown request '{op}'"})
+
+
+class TcpWorkerServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+    class UnixWorkerServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def serveWorker(address, slots):
+    # Runs a build worker until interrupted; at most `slots` gcc processes at once
+    family, target = parseAddress(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(target):
+            os.remove(target)  # left over from a worker that didn't shut down
+        server = UnixWorkerServer(target, WorkerHandler)
+    else:
+        server = TcpWorkerServer(target, WorkerHandler)
+
+    server.slots = slots
+    server.gate = threading.BoundedSemaphore(slots)
+    print(f"[Info] Build worker listening on {address} with {slots} slots", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if family == socket.AF_UNIX and os.path.exists(target):
+            os.remove(target)
+
+# ---------------- COORDINATOR ----------------
+
+class RemoteWorker:
+    def __init__(self, address, timeout):
+        self.address = address
+        self.family, self.target = parseAddress(address)
+        self.timeout = timeout
+
+    def connect(self):
+        sock = socket.socket(self.family, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.target)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def hello(self):
+        # Jobs the worker runs at once, 0 when it can't be used
+        try:
+            with self.connect() as sock:
+                sendMessage(sock, {"op": "hello"})
+                header, _ = receiveMessage(sock)
+        except (OSError, ValueError) as e:
+            print(f"[Warning] Build worker {self.address} is unavailable: {e}")
+            return 0
+        if header.get("version") != PROTOCOL_VERSION:
+            print(f"[Warning] Build worker {self.address} speaks protocol {header.get('version')}, not {PROTOCOL_VERSION}")
+            return 0
+        return max(int(header.get("slots", 1)), 1)
+
+
+class BuildFarm:
+    # Compiles a batch of C files to objects on the workers and local slots
+    def __init__(self, addresses, localJobs=1, timeout=120):
+        self.workers = [RemoteWorker(address, timeout) for address in addresses]
+        self.localJobs = localJobs
+        self.condition = threading.Condition()
+        self.pending = deque()
+        self.inFlight = 0
+
+    def nextJob(self):
+        # Index of the next job, None once every job is done. Waits while others are in flight: they may give theirs back.
+        with self.condition:
+            while not self.pending and self.inFlight:
+                self.condition.wait()
+            if not self.pending:
+                return None
+            self.inFlight += 1
+            return self.pending.popleft()
+
+    def finishJob(self, index=None):
+        # A slot is done with its job; index puts the job back in the queue for another slot
+        with self.condition:
+            self.inFlight -= 1
+            if index is not None:
+                self.pending.appendleft(index)
+            self.condition.notify_all()
+
+    def compileLocally(self, job):
+        cPath, objectPath, flags = job
+        result = subprocess.run(["gcc", "-c", cPath, "-o", objectPath] + flags, capture_output=True, text=True)
+        return result.returncode == 0, result.stderr, "local"
+
+    def localSlot(self, jobs, results):
+        while True:
+            index = self.nextJob()
+            if index is None:
+                return
+            try:
+                results[index] = self.compileLocally(jobs[index])
+            finally:
+                self.finishJob()
+
+    def remoteSlot(self, worker, jobs, results):
+        sock = None
+        try:
+            while True:
+                index = self.nextJob()
+                if index is None:
+                    return
+                cPath, objectPath, flags = jobs[index]
+                _, compileFlags = splitFlags(flags)
+
+                preprocessed = subprocess.run(["gcc", "-E", cPath] + flags, capture_output=True)
+                if preprocessed.returncode != 0:
+                    results[index] = False, preprocessed.stderr.decode(errors="replace"), "local"
+                    self.finishJob()
+                    continue
+
+                try:
+                    if sock is None:
+                        sock = worker.connect()
+                    sendMessage(sock, {"op": "compile", "flags": compileFlags}, preprocessed.stdout)
+                    header, objectFile = receiveMessage(sock)
+                except (OSError, ValueError) as e:
+                    print(f"[Warning] Build worker {worker.address} failed, its jobs go elsewhere: {e}")
+                    self.finishJob(index)
+                    return
+
+                if header.get("ok"):
+                    with open(objectPath, "wb") as f:
+                        f.write(objectFile)
+                results[index] = bool(header.get("ok")), header.get("stderr", ""), worker.address
+                self.finishJob()
+        finally:
+            if sock is not None:
+                sock.close()
+
+    def compileObjects(self, jobs):
+        # jobs: (C path, object path, gcc flags). Returns (ok, gcc messages, where it was compiled) for each.
+        results = [None] * len(jobs)
+        self.pending = deque(range(len(jobs)))
+        self.inFlight = 0
+
+        # Worker slots start first so a small build isn't taken entirely by the local ones
+        threads = []
+        for worker in self.workers:
+            threads += [threading.Thread(target=self.remoteSlot, args=(worker, jobs, results))
+                        for _ in range(worker.hello())]
+        threads += [threading.Thread(target=self.localSlot, args=(jobs, results)) for _ in range(self.localJobs)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Jobs given back after every slot had stopped, e.g. with no local slots and all workers gone
+        for index, result in enumerate(results):
+            if result is None:
+                results[index] = self.compileLocally(jobs[index])
+        return results
+
+# ---------------- ENTRY POINTS ----------------
+
+def workerAddresses(args):
+    # --workers a,b,c or the CPX_WORKERS environment variable
+    value = compiler.getArgValue(args, "--workers", os.environ.get("CPX_WORKERS", ""))
+    return [address.strip() for address in value.split(",") if address.strip()]
+
+@contextmanager
+def localWorkers(count, slots=1):
+    # Starts build worker processes on this machine for the duration of the block, yields their addresses
+    workDir = tempfile.mkdtemp(prefix="cpx-workers-")
+    addresses = []
+    for i in range(count):
+        if hasattr(socket, "AF_UNIX"):
+            addresses.append(f"unix:{os.path.join(workDir, f'worker{i}.sock')}")
+        else:
+            with socket.socket() as probe:
+                probe.bind(("127.0.0.1", 0))
+                addresses.append(f"127.0.0.1:{probe.getsockname()[1]}")
+
+    processes = [subprocess.Popen(compiler.cpxCommand() + ["worker", "--listen", address, "-j", str(slots)],
+                                  stdout=subprocess.DEVNULL) for address in addresses]
+    try:
+        # Wait until every worker accepts connections
+        deadline = time.perf_counter() + 10
+        for address in addresses:
+            worker = RemoteWorker(address, 1)
+            while True:
+                try:
+                    worker.connect().close()
+                    break
+                except OSError:
+                    if time.perf_counter() > deadline:
+                        raise RuntimeError(f"build worker {address} did not start")
+                    time.sleep(0.02)
+        yield addresses
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+        for name in os.listdir(workDir):
+            os.remove(os.path.join(workDir, name))
+        os.rmdir(workDir)
+
+def buildProgram(cPaths, outputPath, args, addresses=None):
+    # Compiles C files to objects on the build farm and links them locally; returns True on success
+    if addresses is None:
+        addresses = workerAddresses(args)
+    flags = compiler.gccFlags(args) + (["-g"] if "-l" in args else [])
+    farm = BuildFarm(addresses, int(compiler.getArgValue(args, "--local-jobs", 1)))
+
+    with tempfile.TemporaryDirectory(prefix="cpx-build-") as workDir:
+        jobs = [(cPath, os.path.join(workDir, f"{i}.o"), flags) for i, cPath in enumerate(cPaths)]
+        start = time.perf_counter()
+        results = farm.compileObjects(jobs)
+        elapsed = time.perf_counter() - start
+
+        failed = False
+        placements = {}
+        for (cPath, _, _), (ok, messages, where) in zip(jobs, results):
+            placements[where] = placements.get(where, 0) + 1
+            if messages:
+                print(messages, end="" if messages.endswith("\n") else "\n")
+            if not ok:
+                print(f"[Error] GCC compilation failed for '{cPath}'")
+                failed = True
+        summary = ", ".join(f"{count} on {where}" for where, count in sorted(placements.items()))
+        print(f"[Info] Compiled {len(jobs)} objects in {elapsed:.2f}s ({summary})")
+        if failed:
+            return False
+
+        link = subprocess.run(["gcc"] + [objectPath for _, objectPath, _ in jobs] + ["-o", outputPath],
+                              capture_output=True, text=True)
+        if link.returncode != 0:
+            print(f"[Error] Linking failed:\n{link.stderr}")
+            return False
+    return True
+
+def buildMain(args):
+    # cpx build <a.cpx> [b.cpx ...] [-o program] [--workers host:port,unix:/path] [--local-workers n]
+    #           [--local-jobs n] [-O2] [-l] [-r] [-d]
+    valued = {compiler.getArgValue(args, flag) for flag in ["-o", "--workers", "--local-workers", "--local-jobs",
+                                                            "--diagnostics", "--max-diagnostics"]
+              if flag in args}
+    sources = [arg for arg in args if arg.endswith(".cpx") and arg not in valued]
+    if not sources:
+        print("[Error] Usage: cpc build <a.cpx> [b.cpx ...] [-o program] [--workers host:port,unix:/path]")
+        sys.exit(1)
+
+    cPaths = []
+    for source in sources:
+        if not os.path.exists(source):
+            print(f"[Error] File not found: '{source}'")
+            sys.exit(1)
+        cPath = source[:-3] + "c"
+        sourceMap = compiler.translateFile(source, cPath, "-l" in args, "--no-fold" not in args, True,
+                                           "--checked" in args)
+        failed = compiler.diagnostics.hasErrors()
+        compiler.flushDiagnostics(args)
+        if sourceMap is None:
+            print(f"[Error] Failed to read input file '{source}'")
+            sys.exit(1)
+        if failed:
+            print(f"[Error] Translation of '{source}' failed, not compiling")
+            sys.exit(1)
+        cPaths.append(cPath)
+
+    output = compiler.getArgValue(args, "-o")
+    exePath = os.path.abspath(output) if output is not None else compiler.executablePath(cPaths[0])
+
+    try:
+        spawned = int(compiler.getArgValue(args, "--local-workers", 0))
+        if spawned:
+            with localWorkers(spawned) as addresses:
+                built = buildProgram(cPaths, exePath, args, workerAddresses(args) + addresses)
+        else:
+            built = buildProgram(cPaths, exePath, args)
+    finally:
+        for cPath in cPaths:
+            if os.path.exists(cPath):
+                os.remove(cPath)
+
+    if not built:
+        sys.exit(1)
+    if "-r" in args:
+        compiler.timedRun([exePath])
+        if "-d" in args and os.path.exists(exePath):
+            os.remove(exePath)
+
+def workerMain(args):
+    # cpx worker [--listen host:port | unix:/path] [-j slots]
+    address = compiler.getArgValue(args, "--listen", f"127.0.0.1:{DEFAULT_PORT}")
+    serveWorker(address, int(compiler.getArgValue(args, "-j", os.cpu_count() or 1)))
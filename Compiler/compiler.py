@@ -1,29 +1,619 @@
 import re
 import sys
 import os
-import subprocess
-import platform
+import time
+
+# subprocess and hashlib are imported by the functions that run gcc or programs,
+# so "cpx -v" and translate-only runs (-c) start without loading them
+
+class Symbol:
+    # One declared name. Slots keep each entry small when files declare millions of names.
+    __slots__ = ("name", "type", "kind", "line", "depth", "shadowed")
+
+    def __init__(self, name, vartype, kind, line, depth, shadowed):
+        self.name = name
+        self.type = vartype
+        self.kind = kind
+        self.line = line
+        self.depth = depth
+        self.shadowed = shadowed  # same name in an enclosing scope, restored when this scope closes
+
+class SymbolTable:
+    # Scoped symbol table filled in during translation.
+    # Every name maps straight to its innermost Symbol, so lookups are one dict probe at any depth;
+    # each scope only remembers which names it declared so closing it can restore shadowed entries.
+    __slots__ = ("symbols", "scopes", "currentLine", "journal")
+
+    def __init__(self):
+        self.symbols = {}
+        self.scopes = [[]]
+        self.currentLine = None
+        self.journal = None  # while set to a list, declarations and scope changes are recorded for replay()
+
+    def clear(self):
+        self.symbols.clear()
+        self.scopes = [[]]
+        self.currentLine = None
+
+    def declare(self, name, vartype, kind="variable"):
+        name = sys.intern(name)
+        depth = len(self.scopes) - 1
+        previous = self.symbols.get(name)
+
+        if previous is not None and previous.depth == depth:
+            # Redeclared in the same scope: replace it, keep whatever it was shadowing
+            previous = previous.shadowed
+        else:
+            self.scopes[-1].append(name)
+
+        symbol = Symbol(name, vartype, kind, self.currentLine, depth, previous)
+        self.symbols[name] = symbol
+        if self.journal is not None:
+            self.journal.append(("declare", name, vartype, kind))
+        return symbol
+
+    def lookup(self, name):
+        return self.symbols.get(name)
+
+    def typeOf(self, name):
+        symbol = self.symbols.get(name)
+        return None if symbol is None else symbol.type
+
+    def pushScope(self):
+        self.scopes.append([])
+        if self.journal is not None:
+            self.journal.append(("push",))
+
+    def popScope(self):
+        if self.journal is not None:
+            self.journal.append(("pop",))
+        if len(self.scopes) == 1:
+            return  # unbalanced "}", keep the file scope
+        for name in self.scopes.pop():
+            shadowed = self.symbols[name].shadowed
+            if shadowed is None:
+                del self.symbols[name]
+            else:
+                self.symbols[name] = shadowed
+
+    def snapshot(self):
+        # Copy of the current scopes; cheap, since a Symbol is never modified once declared
+        return dict(self.symbols), [list(scope) for scope in self.scopes]
+
+    def restore(self, snapshot):
+        table, scopes = snapshot
+        self.symbols = dict(table)
+        self.scopes = [list(scope) for scope in scopes]
+
+    def replay(self, journal):
+        # Applies recorded changes again without retranslating the lines that made them
+        for operation in journal:
+            if operation[0] == "declare":
+                self.declare(operation[1], operation[2], operation[3])
+            elif operation[0] == "push":
+                self.pushScope()
+            else:
+                self.popScope()
+
+# Declared C+ types of variables, parameters and functions seen so far
+symbols = SymbolTable()
+
+# ---------------- DIAGNOSTICS ----------------
+# Errors, warnings and notes are recorded while a file is translated and written out once at the end,
+# as text or JSON: cpx file.cpx [--diagnostics text|json] [--max-diagnostics 100] [--timings]
+
+SEVERITY_LABELS = {"error": "[Error]", "warning": "[Warning]", "info": "[Info]"}
+
+# E = error, W = warning, I = information
+DIAGNOSTIC_CODES = {
+    "E001": "input file can't be read",
+    "E002": "output file can't be written",
+    "E101": "line can't be tokenised",
+    "E102": "internal error while translating a line",
+    "E103": "print argument of unknown type",
+    "W001": "old output file can't be removed",
+    "W101": "statement can't be translated, kept as written",
+    "W102": "malformed import",
+    "W103": "restrict on a type that isn't a pointer",
+    "W104": "struct is never closed",
+    "W105": "struct field of unknown size, declaration order kept",
+    "W106": "interpolated name of unknown type, left as text",
+    "W107": "value of unknown type assigned to a string",
+    "I101": "struct layout",
+}
+
+
+class Diagnostic:
+    __slots__ = ("severity", "code", "message", "line", "column")
+
+    def __init__(self, severity, code, message, line, column):
+        self.severity = severity
+        self.code = code
+        self.message = message
+        self.line = line  # 1-based .cpx line, None for the whole file
+        self.column = column  # 1-based, None when unknown
+
+    def toDict(self):
+        return {"severity": self.severity, "code": self.code, "message": self.message,
+                "line": self.line, "column": self.column}
+
+
+class Diagnostics:
+    # Buffer for one translation: reporting only appends a record, so noisy files don't pay for a
+    # terminal write per message, and tools get line, column and code without parsing text.
+    def __init__(self):
+        self.records = []
+        self.timings = []  # (stage, seconds)
+        self.source = None
+        self.line = None  # line being translated, the default location of a report
+
+    def clear(self, source=None):
+        self.records = []
+        self.timings = []
+        self.source = source
+        self.line = None
+
+    def report(self, severity, code, message, line=None, column=None):
+        self.records.append(Diagnostic(severity, code, message, self.line if line is None else line, column))
+
+    def error(self, code, message, line=None, column=None):
+        self.report("error", code, message, line, column)
+
+    def warning(self, code, message, line=None, column=None):
+        self.report("warning", code, message, line, column)
+
+    def info(self, code, message, line=None, column=None):
+        self.report("info", code, message, line, column)
+
+    def time(self, stage, seconds):
+        self.timings.append((stage, seconds))
+
+    def hasErrors(self):
+        return any(record.severity == "error" for record in self.records)
+
+    def render(self, outputFormat="text", limit=None, showTimings=False):
+        # The buffered diagnostics as one string; at most `limit` records, errors first
+        shown = self.records
+        if limit is not None and len(shown) > limit:
+            kept = sorted(range(len(shown)), key=lambda i: (shown[i].severity != "error", i))[:limit]
+            shown = [shown[i] for i in sorted(kept)]
+        omitted = len(self.records) - len(shown)
+
+        if outputFormat == "json":
+            import json
+            return json.dumps({
+                "source": self.source,
+                "diagnostics": [record.toDict() for record in shown],
+                "omitted": omitted,
+                "timings": [{"stage": stage, "seconds": seconds} for stage, seconds in self.timings],
+            }) + "\n"
+
+        lines = []
+        for record in shown:
+            location = ""
+            if record.line is not None:
+                location = f"{self.source or ''}:{record.line}" + (f":{record.column}" if record.column else "") + ": "
+            lines.append(f"{SEVERITY_LABELS[record.severity]} {location}{record.message} [{record.code}]\n")
+        if omitted:
+            lines.append(f"[Info] {omitted} more diagnostics not shown (--max-diagnostics)\n")
+        if showTimings and self.timings:
+            lines.append("[Info] Timings: " + ", ".join(f"{stage} {seconds * 1000:.1f}ms" for stage, seconds in self.timings) + "\n")
+        return "".join(lines)
+
+    def flush(self, outputFormat="text", limit=None, showTimings=False):
+        # Writes the buffer out in one go and empties it
+        text = self.render(outputFormat, limit, showTimings)
+        if text:
+            sys.stdout.write(text)
+            sys.stdout.flush()
+        self.clear(self.source)
+
+# Diagnostics of the translation in progress
+diagnostics = Diagnostics()
+
+def flushDiagnostics(args):
+    # Writes the buffered diagnostics in the format the command line asked for
+    limit = getArgValue(args, "--max-diagnostics", "100")
+    outputFormat = getArgValue(args, "--diagnostics", "text")
+    diagnostics.flush(outputFormat, int(limit) if limit.isdigit() else None, "--timings" in args)
+
+# Directory the compiler is installed in. Run from the cpx.pyz bundle, __file__ is inside the archive
+# and the installed files sit next to the archive.
+INSTALL_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLE_PATH = INSTALL_DIR if os.path.isfile(INSTALL_DIR) else None
+if BUNDLE_PATH is not None:
+    INSTALL_DIR = os.path.dirname(BUNDLE_PATH)
+
+# Headers shipped with the compiler, e.g. cplus.h for the string type
+RUNTIME_DIR = os.path.join(INSTALL_DIR, "runtime")
+
+def cpxCommand():
+    # Command line that starts this compiler again, e.g. for worker processes
+    if BUNDLE_PATH is not None:
+        return [sys.executable, BUNDLE_PATH]
+    return [sys.executable, os.path.join(INSTALL_DIR, "compiler.py")]
 
 def is_windows():
-    return platform.system() == "Windows"
+    return sys.platform == "win32"
+
+def executablePath(filename):
+    # Absolute path of the executable built from a .c file
+    if is_windows():
+        return os.path.abspath(filename[:-2] + ".exe")
+    return os.path.abspath(filename[:-2])
+
+def gccFlags(args, default=None):
+    # Optimisation level passed through to gcc, e.g. "cpx file.cpx -O3", plus the runtime include path
+    flags = [arg for arg in args if arg in ["-O0", "-O1", "-O2", "-O3", "-Os", "-Ofast"]]
+    if not flags and default is not None:
+        flags = list(default)
+    return flags + ["-I", RUNTIME_DIR]
+
+def getArgValue(args, flag, default=None):
+    # Value that follows a flag, e.g. "--pgo-input data.txt"
+    if flag in args:
+        idx = args.index(flag)
+        if idx + 1 < len(args):
+            return args[idx + 1]
+    return default
+
+def timedRun(command, stdinPath=None, quiet=False):
+    # Runs a command and returns its wall time in seconds, or None on failure
+    import subprocess
+    stdout = subprocess.DEVNULL if quiet else None
+    try:
+        start = time.perf_counter()
+        if stdinPath is not None:
+            with open(stdinPath, 'r') as stdin:
+                subprocess.run(command, stdin=stdin, stdout=stdout, check=True)
+        else:
+            subprocess.run(command, stdout=stdout, check=True)
+        return time.perf_counter() - start
+    except subprocess.CalledProcessError as e:
+        print(f"[Error] Program execution failed with exit code {e.returncode}")
+    except FileNotFoundError as e:
+        print(f"[Error] Could not run '{command[0]}': {e}")
+    return None
+
+def compilePgo(filename, args):
+    # Profile-guided build: plain build, instrumented training run, rebuild with the profile.
+    # Profiles are cached under .cpx_cache/pgo/<hash of the C source> and reused until the source changes.
+    import hashlib
+    import subprocess
+    exePath = executablePath(filename)
+    trainingInput = getArgValue(args, "--pgo-input")
+
+    if trainingInput is not None and not os.path.exists(trainingInput):
+        print(f"[Error] PGO training input not found: '{trainingInput}'")
+        return None
+
+    try:
+        with open(filename, 'rb') as f:
+            key = f.read() + os.path.abspath(filename).encode() + " ".join(gccFlags(args, ["-O2"])).encode()
+            digest = hashlib.sha256(key).hexdigest()[:16]
+    except Exception as e:
+        print(f"[Error] Could not read '{filename}' for PGO: {e}")
+        return None
+
+    optFlags = gccFlags(args, ["-O2"])
+    profileDir = os.path.join(os.path.dirname(os.path.abspath(filename)), ".cpx_cache", "pgo", digest)
+    # gcc nests the .gcda files under the mangled object path inside profileDir
+    cached = any(f.endswith(".gcda") for _, _, files in os.walk(profileDir) for f in files)
+
+    try:
+        subprocess.run(["gcc", filename, "-o", exePath] + optFlags, check=True)
+        before = timedRun([exePath], trainingInput, quiet=True)
+
+        if cached:
+            print(f"[Info] Reusing cached PGO profile: {profileDir}")
+        else:
+            os.makedirs(profileDir, exist_ok=True)
+            subprocess.run(["gcc", filename, f"-fprofile-generate={profileDir}", "-o", exePath] + optFlags, check=True)
+            if timedRun([exePath], trainingInput, quiet=True) is None:
+                print("[Error] PGO training run failed")
+                return None
+
+        subprocess.run(["gcc", filename, f"-fprofile-use={profileDir}", "-fprofile-correction",
+                        "-Wno-missing-profile", "-o", exePath] + optFlags, check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"[Error] GCC compilation failed: {e}")
+        return None
+    except FileNotFoundError:
+        print("[Error] GCC compiler not found. Please ensure GCC is installed and in your PATH.")
+        return None
+
+    after = timedRun([exePath], trainingInput)
+
+    if before is not None and after is not None:
+        change = (before - after) / before * 100 if before > 0 else 0.0
+        print(f"[Info] PGO runtime: before {before:.4f}s, after {after:.4f}s ({change:+.1f}% faster)")
+
+    return exePath
+
+def measuredRun(exePath, stdinPath=None):
+    # Runs the executable once, returns (wall seconds, rusage of that child) or None on failure.
+    # os.wait4 gives the rusage of this child alone, so gcc and earlier runs don't leak into max RSS.
+    # Linux still counts the forking Python process at exec, so max RSS has a floor of roughly its size.
+    import subprocess
+    stdin = None
+    try:
+        if stdinPath is not None:
+            stdin = open(stdinPath, 'r')
+        start = time.perf_counter()
+        process = subprocess.Popen([exePath], stdin=stdin, stdout=subprocess.DEVNULL)
+        _, status, usage = os.wait4(process.pid, 0)
+        elapsed = time.perf_counter() - start
+        process.returncode = os.waitstatus_to_exitcode(status)
+    except FileNotFoundError as e:
+        print(f"[Error] Could not run '{exePath}': {e}")
+        return None
+    finally:
+        if stdin is not None:
+            stdin.close()
+
+    if process.returncode != 0:
+        print(f"[Error] Program execution failed with exit code {process.returncode}")
+        return None
+    return elapsed, usage
+
+def percentile(values, fraction):
+    # Nearest-rank percentile of a list of numbers
+    ordered = sorted(values)
+    rank = max(1, int(fraction * len(ordered) + 0.999999))
+    return ordered[min(rank, len(ordered)) - 1]
+
+def benchmarkProgram(filename, args):
+    # cpx bench <file.cpx> [-n runs] [--warmup runs] [--json out.json] [-O0..-O3]
+    import subprocess
+    import json
+    import statistics
+
+    try:
+        import resource
+    except ImportError:
+        resource = None  # Not available on Windows, only wall time is reported
+
+    try:
+        runs = int(getArgValue(args, "-n", 10))
+        warmup = int(getArgValue(args, "--warmup", 1))
+    except ValueError:
+        print("[Error] -n and --warmup expect whole numbers")
+        return None
+
+    if runs < 1 or warmup < 0:
+        print("[Error] -n must be at least 1 and --warmup can't be negative")
+        return None
+
+    exePath = executablePath(filename)
+    flags = [flag for flag in gccFlags(args) if flag.startswith("-O")]
+
+    try:
+        subprocess.run(["gcc", filename, "-o", exePath] + gccFlags(args), check=True)
+    except subprocess.CalledProcessError as e:
+        print(f"[Error] GCC compilation failed: {e}")
+        return None
+    except FileNotFoundError:
+        print("[Error] GCC compiler not found. Please ensure GCC is installed and in your PATH.")
+        return None
+    finally:
+        try:
+            if os.path.exists(os.path.abspath(filename)):
+                os.remove(os.path.abspath(filename))
+        except Exception as e:
+            print(f"[Warning] Could not remove temporary file '{filename}': {e}")
+
+    stdinPath = getArgValue(args, "--input")
+    wall, user, system, rss = [], [], [], []
+
+    for i in range(warmup + runs):
+        if resource:
+            sample = measuredRun(exePath, stdinPath)
+        else:
+            elapsed = timedRun([exePath], stdinPath, quiet=True)
+            sample = None if elapsed is None else (elapsed, None)
+
+        if sample is None:
+            return None
+        if i < warmup:
+            continue
+
+        wall.append(sample[0])
+        if sample[1] is not None:
+            user.append(sample[1].ru_utime)
+            system.append(sample[1].ru_stime)
+            rss.append(sample[1].ru_maxrss)
+
+    maxRssKb = max(rss) if rss else None
+    if maxRssKb is not None and sys.platform == "darwin":
+        maxRssKb //= 1024  # macOS reports bytes, Linux reports kilobytes
+
+    def summary(values):
+        if not values:
+            return None
+        return {"min": min(values), "median": statistics.median(values), "p95": percentile(values, 0.95)}
+
+    results = {
+        "file": filename[:-2] + ".cpx",
+        "flags": flags,
+        "runs": runs,
+        "warmup": warmup,
+        "timestamp": time.time(),
+        "wall": summary(wall),
+        "user": summary(user),
+        "sys": summary(system),
+        "maxRssKb": maxRssKb,
+    }
+
+    print(f"[Info] {runs} runs after {warmup} warmup ({' '.join(flags) or 'default flags'})")
+    for label in ["wall", "user", "sys"]:
+        stats = results[label]
+        if stats:
+            print(f"    {label:<5} min {stats['min']:.4f}s  median {stats['median']:.4f}s  p95 {stats['p95']:.4f}s")
+    if maxRssKb is not None:
+        print(f"    max RSS {maxRssKb} KB")
+
+    jsonPath = getArgValue(args, "--json")
+    if jsonPath is not None:
+        try:
+            with open(jsonPath, 'w') as f:
+                json.dump(results, f, indent=2)
+            print(f"[Info] Results written to '{jsonPath}'")
+        except Exception as e:
+            print(f"[Error] Could not write '{jsonPath}': {e}")
+
+    if "-d" in args:
+        try:
+            if os.path.exists(exePath):
+                os.remove(exePath)
+        except Exception as e:
+            print(f"[Warning] Could not remove executable '{exePath}': {e}")
+
+    return results
+
+def hotLinesPerf(exePath, stdinPath, workDir):
+    # {cpx line: percent} from perf, or None if perf isn't usable here
+    import subprocess
+    import shutil
+
+    if shutil.which("perf") is None:
+        return None
+
+    dataPath = os.path.join(workDir, "perf.data")
+    try:
+        subprocess.run(["perf", "record", "-q", "-o", dataPath, "--", exePath],
+                       stdin=open(stdinPath, 'r') if stdinPath else None,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+        report = subprocess.run(["perf", "report", "-i", dataPath, "--stdio", "--no-children", "-q",
+                                 "--sort", "srcline"], capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, OSError):
+        return None  # e.g. perf_event_paranoid forbids sampling
+
+    hot = {}
+    for match in re.finditer(r"([\d.]+)%\s+(\S+\.cpx):(\d+)", report.stdout):
+        hot[int(match.group(3))] = hot.get(int(match.group(3)), 0.0) + float(match.group(1))
+    return hot
+
+def hotLinesGprof(filename, exePath, stdinPath, workDir, args):
+    # {cpx line: percent} from a -pg build and gprof's line-level flat profile, or None
+    import subprocess
+    import shutil
+
+    if shutil.which("gprof") is None:
+        return None
+
+    try:
+        subprocess.run(["gcc", filename, "-g", "-pg", "-o", exePath] + gccFlags(args, ["-O2"]), check=True)
+        # gmon.out is written to the working directory of the profiled program
+        subprocess.run([exePath], cwd=workDir, stdin=open(stdinPath, 'r') if stdinPath else None,
+                       stdout=subprocess.DEVNULL, check=True)
+        report = subprocess.run(["gprof", "-b", "-l", exePath, os.path.join(workDir, "gmon.out")],
+                                capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+    # The line table already holds .cpx numbers thanks to #line, gprof just prints the C file's name
+    hot = {}
+    for match in re.finditer(r"^\s*([\d.]+)\s.*\((\S+):(\d+) @", report.stdout, re.MULTILINE):
+        hot[int(match.group(3))] = hot.get(int(match.group(3)), 0.0) + float(match.group(1))
+    return hot
+
+def profileProgram(filename, args):
+    # cpx profile <file.cpx> [--top 10] [--input stdin.txt]: hottest .cpx lines via perf, falling back to gprof
+    import subprocess
+    import tempfile
+
+    exePath = executablePath(filename)
+    stdinPath = getArgValue(args, "--input")
+    cpxPath = filename[:-2] + ".cpx"
+
+    try:
+        top = int(getArgValue(args, "--top", 10))
+    except ValueError:
+        print("[Error] --top expects a whole number")
+        return None
+
+    try:
+        with tempfile.TemporaryDirectory() as workDir:
+            hot = None
+            tool = "perf"
+            try:
+                subprocess.run(["gcc", filename, "-g", "-o", exePath] + gccFlags(args, ["-O2"]), check=True)
+                hot = hotLinesPerf(exePath, stdinPath, workDir)
+            except subprocess.CalledProcessError as e:
+                print(f"[Error] GCC compilation failed: {e}")
+                return None
+            except FileNotFoundError:
+                print("[Error] GCC compiler not found. Please ensure GCC is installed and in your PATH.")
+                return None
+
+            if not hot:
+                tool = "gprof"
+                hot = hotLinesGprof(filename, exePath, stdinPath, workDir, args)
+    finally:
+        for path in [os.path.abspath(filename), exePath]:
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+            except Exception as e:
+                print(f"[Warning] Could not remove '{path}': {e}")
+
+    if hot is None:
+        print("[Error] No usable profiler found. Install perf or gprof (binutils) to use cpx profile.")
+        return None
+
+    if not hot:
+        print("[Info] The program ran too briefly to collect any samples")
+        return hot
+
+    print(f"[Info] Hottest lines in {cpxPath} ({tool}):")
+    for cpxLine, percent in sorted(hot.items(), key=lambda item: item[1], reverse=True)[:top]:
+        source = getLine(cpxPath, cpxLine) or ""
+        print(f"    {percent:6.2f}%  line {cpxLine:<5} {source.strip()}")
+
+    return hot
 
 def compileC(filename, args):
     try:
+        if "--pgo" in args:
+            exePath = compilePgo(filename, args)
+
+            try:
+                if os.path.exists(os.path.abspath(filename)):
+                    os.remove(os.path.abspath(filename))
+            except Exception as e:
+                print(f"[Warning] Could not remove temporary file '{filename}': {e}")
+
+            if exePath is not None and "-d" in args:
+                try:
+                    if os.path.exists(exePath):
+                        os.remove(exePath)
+                except Exception as e:
+                    print(f"[Warning] Could not remove executable '{exePath}': {e}")
+            return
+
         if "-c" not in args:
+            import subprocess
             # Determine output executable name based on OS
             if is_windows():
                 output_name = filename[:-2] + ".exe"
             else:
                 output_name = filename[:-2]
             
-            try:
-                subprocess.run(["gcc", filename, "-o", output_name], check=True)
-            except subprocess.CalledProcessError as e:
-                print(f"[Error] GCC compilation failed: {e}")
-                return
-            except FileNotFoundError:
-                print("[Error] GCC compiler not found. Please ensure GCC is installed and in your PATH.")
-                return
+            if "--workers" in args or os.environ.get("CPX_WORKERS"):
+                # Compile on the build farm, falling back to local gcc if no worker can take it
+                import buildfarm
+                if not buildfarm.buildProgram([filename], os.path.abspath(output_name), args):
+                    return
+            else:
+                try:
+                    debugFlags = ["-g"] if "-l" in args else []
+                    subprocess.run(["gcc", filename, "-o", output_name] + gccFlags(args) + debugFlags, check=True)
+                except subprocess.CalledProcessError as e:
+                    print(f"[Error] GCC compilation failed: {e}")
+                    return
+                except FileNotFoundError:
+                    print("[Error] GCC compiler not found. Please ensure GCC is installed and in your PATH.")
+                    return
 
             try:
                 if os.path.exists(os.path.abspath(filename)):
@@ -71,27 +661,33 @@ def writeFile(args, filepath):
             with open(filepath, 'a') as file:
                 file.write(line)
         except FileNotFoundError:
-            print(f"[Error] File not found at '{filepath}'")
+            diagnostics.error("E002", f"File not found at '{filepath}'")
         except PermissionError:
-            print(f"[Error] Permission denied when writing to '{filepath}'")
+            diagnostics.error("E002", f"Permission denied when writing to '{filepath}'")
         except Exception as e:
-            print(f"[Error] An error occurred while writing: {e}")
+            diagnostics.error("E002", f"An error occurred while writing: {e}")
     except Exception as e:
-        print(f"[Error] Unexpected error in writeFile: {e}")
+        diagnostics.error("E002", f"Unexpected error in writeFile: {e}")
 
-def countLines(filepath):
+def readLines(filepath):
+    # Every line of a file without its newline, read in one go, or None if it can't be read
     try:
         with open(filepath, 'r') as f:
-            return sum(1 for _ in f)
+            text = f.read()
     except FileNotFoundError:
-        print(f"[Error] File not found: '{filepath}'")
-        return -1
+        diagnostics.error("E001", f"File not found: '{filepath}'")
+        return None
     except PermissionError:
-        print(f"[Error] Permission denied when reading '{filepath}'")
-        return -1
+        diagnostics.error("E001", f"Permission denied when reading '{filepath}'")
+        return None
     except Exception as e:
-        print(f"[Error] Could not count lines in '{filepath}': {e}")
-        return -1
+        diagnostics.error("E001", f"Could not read '{filepath}': {e}")
+        return None
+
+    lines = text.split("\n")
+    if lines[-1] == "":
+        lines.pop()  # the final newline doesn't start another line
+    return lines
 
 def getLine(filename, n):
     try:
@@ -101,13 +697,13 @@ def getLine(filename, n):
                     return line.rstrip("\n")
         return None
     except FileNotFoundError:
-        print(f"[Error] File not found: '{filename}'")
+        diagnostics.error("E001", f"File not found: '{filename}'")
         return None
     except PermissionError:
-        print(f"[Error] Permission denied when reading '{filename}'")
+        diagnostics.error("E001", f"Permission denied when reading '{filename}'")
         return None
     except Exception as e:
-        print(f"[Error] Could not read line {n} from '{filename}': {e}")
+        diagnostics.error("E001", f"Could not read line {n} from '{filename}': {e}", n)
         return None
 
 def regexEngine(line):
@@ -125,9 +721,612 @@ def regexEngine(line):
 
         return re.findall(pattern, line, re.VERBOSE)
     except Exception as e:
-        print(f"[Error] Regex parsing failed on line: '{line}': {e}")
+        diagnostics.error("E101", f"Regex parsing failed on line: '{line}': {e}")
         return []
 
+# printf conversion for each declared C+ type, used when lowering print
+FORMAT_SPECIFIERS = {
+    "int": "%d",
+    "unsigned int": "%u",
+    "short": "%hd",
+    "unsigned short": "%hu",
+    "long": "%ld",
+    "unsigned long": "%lu",
+    "long long": "%lld",
+    "unsigned long long": "%llu",
+    "float": "%f",
+    "double": "%f",
+    "char": "%c",
+    "char*": "%s",
+    "size_t": "%zu",
+}
+
+def splitTopLevel(text, separator):
+    # Splits on a separator character that is outside string/char literals and brackets
+    parts = []
+    depth = 0
+    quote = None
+    current = ""
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            current += ch
+            if ch == "\\" and i + 1 < len(text):
+                current += text[i + 1]
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+            current += ch
+        elif ch in "([{":
+            depth += 1
+            current += ch
+        elif ch in ")]}":
+            depth -= 1
+            current += ch
+        elif ch == separator and depth == 0:
+            parts.append(current)
+            current = ""
+        else:
+            current += ch
+        i += 1
+    parts.append(current)
+    return parts
+
+def matchingParen(text, start):
+    # Index of the ")" closing the "(" at text[start], skipping string literals, or -1
+    depth = 0
+    quote = None
+    i = start
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+            if depth == 0:
+                return i
+        i += 1
+    return -1
+
+# Types that promote to int in arithmetic
+PROMOTED_TYPES = ["char", "unsigned char", "short", "unsigned short"]
+
+def expressionType(expression):
+    # Declared type of a print argument, or None when it can't be told from the symbol table
+    declared = symbols.typeOf(expression)
+    if declared is not None:
+        return declared
+    sizeQuery = re.match(r"(?:sizeof|_Alignof)\s*\(", expression)
+    if (sizeQuery and matchingParen(expression, sizeQuery.end() - 1) == len(expression) - 1) or \
+            re.fullmatch(r"sizeof\s+[A-Za-z_]\w*", expression):
+        return "size_t"
+
+    access = re.fullmatch(r"([A-Za-z_]\w*)((?:\[[^\[\]]+\]|\.\w+|->\w+)+)", expression)
+    if access:
+        # Each index drops one array dimension or pointer level (a[i] of int[8] is an int), each field
+        # is looked up in its struct (p.x, p->x) and a string's .len is its size_t length
+        elementType = symbols.typeOf(access.group(1))
+        for step in re.findall(r"\[[^\[\]]+\]|\.\w+|->\w+", access.group(2)):
+            if elementType is None:
+                return None
+            if step.startswith("["):
+                if elementType == "string":
+                    elementType = "char"
+                elif elementType.endswith("]"):
+                    elementType = elementType[:elementType.rindex("[")]
+                elif elementType.endswith("*"):
+                    elementType = elementType[:-1].rstrip()
+                else:
+                    return None
+            elif step == ".len" and elementType == "string":
+                elementType = "size_t"
+            else:
+                if step.startswith("->"):
+                    if not elementType.endswith("*"):
+                        return None
+                    elementType = elementType[:-1].rstrip()
+                elif elementType.endswith("*"):
+                    return None
+                elementType = structFields.get(elementType, {}).get(step.lstrip(".->"))
+        return elementType
+
+    call = re.fullmatch(r"([A-Za-z_]\w*)\s*\(", expression[:expression.find("(") + 1])
+    if call and matchingParen(expression, expression.find("(")) == len(expression) - 1:
+        function = symbols.lookup(call.group(1))
+        return function.type if function is not None and function.kind == "function" else None
+
+    # Otherwise only arithmetic on declared numeric variables and plain literals is understood:
+    # no calls, members, indexing, strings, casts, ternaries or suffixed literals
+    if re.search(r"[\"'\[\]?:,{}]|->|[A-Za-z_]\w*\s*\(|(?<![\w.])\.(?!\d)|\b(?:0[xX][0-9a-fA-F]+|\d+)[uUlL]+\b", expression):
+        return None
+    types = []
+    for name in re.findall(r"(?<![\w.])[A-Za-z_]\w*", expression):
+        declared = symbols.typeOf(name)
+        if declared in PROMOTED_TYPES:
+            declared = "int"
+        if declared not in INDEX_TYPES + ["float", "double"]:
+            return None
+        types.append(declared)
+
+    if re.search(r"(?<![<>])[<>](?![<>])|[<>!=]=|&&|\|\||!", expression):
+        return "int"  # comparisons and logical operators
+    if "float" in types or "double" in types or re.search(r"\d\.|\.\d|\d[eE][+-]?\d", expression):
+        return "double"
+    return max(types, key=INDEX_TYPES.index) if types else "int"
+
+def formatSpecifier(expression):
+    # (printf conversion, argument) for an expression, based on the declared variable types,
+    # or None when its type isn't known
+    declared = expressionType(expression)
+    if declared == "string":
+        # cp_string carries its length, so printf never has to scan for the terminator
+        return "%.*s", f"(int){expression}.len, {expression}.data"
+    if declared in FORMAT_SPECIFIERS:
+        return FORMAT_SPECIFIERS[declared], expression
+    if declared is not None and declared.endswith("*"):
+        return "%p", f"(void *){expression}"
+    return None
+
+def interpolate(literal, fmt, arguments, column=None):
+    # Folds a string literal's body into the format, replacing {name} with a conversion.
+    # "{{" and "}}" are literal braces, unknown names and names of unknown type are left untouched.
+    pos = 0
+    for match in re.finditer(r"\{\{|\}\}|\{([A-Za-z_][A-Za-z0-9_]*)\}|%", literal):
+        fmt.append(literal[pos:match.start()])
+        token = match.group(0)
+        if token == "%":
+            fmt.append("%%")
+        elif token in ["{{", "}}"]:
+            fmt.append(token[0])
+        elif symbols.lookup(match.group(1)) is not None and formatSpecifier(match.group(1)) is not None:
+            spec, argument = formatSpecifier(match.group(1))
+            fmt.append(spec)
+            arguments.append(argument)
+        else:
+            if symbols.lookup(match.group(1)) is not None:
+                diagnostics.warning("W106", f"Can't tell how to print '{match.group(1)}', left as text", column=column)
+            fmt.append(token)
+        pos = match.end()
+    fmt.append(literal[pos:])
+
+def lowerPrint(rest, column=None):
+    # Lowers the text after "print" into a single printf call.
+    # print(hello + ", " + name + "!") -> printf("%s, %s!\n", hello, name)
+    # Literal pieces are folded at compile time, "{x}" in a literal interpolates x and a newline is
+    # added unless the format already ends with one. Calls that already pass printf style arguments
+    # (a top-level comma) return None and are only renamed; so do values of unknown type, which are
+    # reported as errors so the C is never built.
+    start = rest.find("(")
+    if start == -1 or rest[:start].strip() != "":
+        return None
+
+    end = matchingParen(rest, start)
+    if end == -1:
+        return None
+
+    inner = rest[start + 1:end]
+    if len(splitTopLevel(inner, ",")) > 1:
+        return None
+
+    pieces = [piece.strip() for piece in splitTopLevel(inner, "+")]
+    if any(piece == "" for piece in pieces):
+        return None
+
+    def isText(piece):
+        return (piece.startswith('"') and piece.endswith('"') and len(piece) >= 2) or \
+            symbols.typeOf(piece) in ["string", "char*"]
+
+    # Without any string piece, "+" is arithmetic and the whole expression is one value
+    if not any(isText(piece) for piece in pieces):
+        pieces = [inner.strip()]
+
+    fmt = []
+    arguments = []
+    for piece in pieces:
+        if piece.startswith('"') and piece.endswith('"') and len(piece) >= 2:
+            interpolate(piece[1:-1], fmt, arguments, column)
+        elif re.fullmatch(r"-?\d+(\.\d+)?", piece):
+            fmt.append(piece)  # numeric literal, folded into the format
+        elif formatSpecifier(piece) is None:
+            diagnostics.error("E103", f"Can't tell how to print '{piece}', declare it with a type or use printf",
+                              column=column)
+            return None
+        else:
+            spec, argument = formatSpecifier(piece)
+            fmt.append(spec)
+            arguments.append(argument)
+
+    formatString = "".join(fmt)
+    if not formatString.endswith("\\n"):
+        formatString += "\\n"
+
+    call = "printf(" + ", ".join(['"' + formatString + '"'] + arguments) + ")"
+    return call, rest[end + 1:]
+
+# Set when the translation uses the C+ runtime header (runtime/cplus.h)
+runtimeNeeded = False
+
+# fn parameters waiting for the function body's "{" to open their scope
+pendingParameters = []
+
+# Sizes in bytes of C+ element types on the host (LP64, LLP64 on Windows)
+TYPE_SIZES = {
+    "char": 1,
+    "short": 2,
+    "int": 4,
+    "float": 4,
+    "long": 4 if is_windows() else 8,
+    "long long": 8,
+    "double": 8,
+}
+
+# Alignment for numeric arrays big enough to be worth vectorising (one AVX register)
+ARRAY_ALIGNMENT = 32
+
+# Set for checked builds (--checked): array indexing goes through cp_bounds_check
+boundsChecks = False
+
+def modifiedType(vartype, modifiers):
+    # C type for a C+ type and its "; unsigned; long long" style modifiers
+    if "long" in modifiers:
+        size = "long long" if modifiers.count("long") == 2 else "long"
+    elif "short" in modifiers:
+        size = "short"
+    else:
+        size = None
+
+    ctype = vartype
+    if size is not None and vartype == "int":
+        ctype = size
+    if "unsigned" in modifiers and vartype in ["int", "char"]:
+        ctype = "unsigned " + ctype
+    return ctype
+
+def lowerArrayDeclaration(text):
+    # let a: int[10]; static = {1, 2, 3}  ->  static _Alignas(32) int a[10] = {1, 2, 3}
+    # Returns None when the text isn't an array declaration.
+    match = re.match(r"^let\s+(\w+)\s*:\s*(\w+)\s*((?:\[[^\]]+\]\s*)+)((?:;[\w\s]+)*)(?:=\s*(.+?))?\s*$", text)
+    if match is None:
+        return None
+
+    name, vartype, dims, modifiers, value = match.groups()
+    modifiers = re.findall(r"\w+", modifiers)
+    dims = [dim.strip() for dim in re.findall(r"\[([^\]]+)\]", dims)]
+
+    ctype = modifiedType(vartype, modifiers)
+    if vartype == "string":
+        ctype = "cp_string"
+        global runtimeNeeded
+        runtimeNeeded = True
+
+    # Elements of a string array are recorded as strings, like string scalars, so ss[i] prints and copies as one
+    elementType = "string" if vartype == "string" else ctype
+    symbols.declare(name, elementType + "".join(f"[{dim}]" for dim in dims), "array")
+
+    parts = []
+    if "static" in modifiers:
+        parts.append("static")
+
+    # Align numeric arrays of known size that span at least one vector register
+    elementSize = TYPE_SIZES.get(ctype.replace("unsigned ", ""))
+    if elementSize is not None and all(dim.isdigit() for dim in dims):
+        total = elementSize
+        for dim in dims:
+            total *= int(dim)
+        if total >= ARRAY_ALIGNMENT:
+            parts.append(f"_Alignas({ARRAY_ALIGNMENT})")
+
+    parts.append(f"{ctype} {name}" + "".join(f"[{dim}]" for dim in dims))
+    declaration = " ".join(parts)
+
+    if value is not None:
+        value = value.strip()
+        # A single value fills the whole array the C way, e.g. "= 0" -> "= {0}"
+        if not value.startswith("{"):
+            value = "{" + value + "}"
+        declaration += " = " + value
+    return declaration
+
+def insertBoundsChecks(text):
+    # name[i][j] -> name[cp_bounds_check(i, N, ...)][cp_bounds_check(j, M, ...)] for declared arrays
+    result = []
+    i = 0
+    quote = None
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            result.append(ch)
+            if ch == "\\" and i + 1 < len(text):
+                result.append(text[i + 1])
+                i += 1
+            elif ch == quote:
+                quote = None
+            i += 1
+            continue
+        if ch in "\"'":
+            quote = ch
+            result.append(ch)
+            i += 1
+            continue
+
+        match = re.compile(r"[A-Za-z_]\w*").match(text, i)
+        if match is None:
+            result.append(ch)
+            i += 1
+            continue
+
+        name = match.group(0)
+        result.append(name)
+        i = match.end()
+        symbol = symbols.lookup(name)
+        if symbol is None or symbol.kind != "array" or (match.start() > 0 and text[match.start() - 1] in ".>"):
+            continue
+
+        global runtimeNeeded
+        runtimeNeeded = True
+        for dim in re.findall(r"\[([^\]]+)\]", symbol.type):
+            if i >= len(text) or text[i] != "[":
+                break
+            end = matchingBracket(text, i)
+            if end == -1:
+                break
+            index = insertBoundsChecks(text[i + 1:end])
+            if constantInBounds(index, dim):
+                result.append(f"[{index}]")  # provably in range, no check needed
+            else:
+                result.append(f'[cp_bounds_check({index}, {dim}, "{name}", __FILE__, __LINE__)]')
+            i = end + 1
+    return "".join(result)
+
+def constantInBounds(index, dim):
+    # True when both are constants and the index is inside the dimension
+    try:
+        value = evaluateConstant(index)
+        size = evaluateConstant(dim)
+    except (NotConstant, ValueError, OverflowError):
+        return False
+    return isinstance(value, int) and isinstance(size, int) and 0 <= value < size
+
+def matchingBracket(text, start):
+    # Index of the "]" closing the "[" at text[start], or -1
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == "[":
+            depth += 1
+        elif text[i] == "]":
+            depth -= 1
+            if depth == 0:
+                return i
+    return -1
+
+def stringInitializer(value):
+    # C initializer for a cp_string from the C+ value after "=", None when there is none
+    global runtimeNeeded
+    runtimeNeeded = True
+
+    if value is None or value == "":
+        return "CP_STR_INIT"
+    if value.startswith('"') and value.endswith('"') and len(value) >= 2:
+        return f"cp_str_lit({value})"
+    if expressionType(value) == "string":
+        return f"cp_str_copy({value})"
+    return f"cp_str_from({value})"
+
+def lowerStringAssignment(text):
+    # s = "hi" -> s = cp_str_lit("hi"), t = s -> t = cp_str_copy(s): a plain C assignment would leave both
+    # strings sharing one buffer, which the first append to either reallocates under the other.
+    # Returns None when the text doesn't assign to a string.
+    match = STRING_ASSIGNMENT.match(text)
+    if match is None or expressionType(match.group(2)) != "string":
+        return None
+
+    indent, target, value = match.groups()
+    if ADDRESSABLE.match(value) is None and (expressionType(value) == "string" or STRING_CONSTRUCTOR.match(value)):
+        return None  # a call returning a new string needs no copy
+    if ADDRESSABLE.match(value) is None and expressionType(value) is None and not value.startswith('"'):
+        diagnostics.warning("W107", f"Can't tell the type of '{value}' assigned to string '{target}', "
+                                    f"converted as a char *")
+    return f"{indent}{target} = {stringInitializer(value)}"
+
+# Runtime calls that already make a cp_string
+STRING_CONSTRUCTOR = re.compile(r"^cp_str_(?:lit|from|copy)\s*\(")
+# name = value, where name can be indexed or a field; "==" and compound assignments don't match
+STRING_ASSIGNMENT = re.compile(r"^(\s*)([A-Za-z_]\w*(?:\[[^\]]*\]|\.\w+|->\w+)*)\s*=(?!=)\s*(.+?)\s*;?\s*$")
+# let[*] name: type[; modifiers] [= value]
+SCALAR_DECLARATION = re.compile(r"^let(\*)?\s+([A-Za-z_]\w*)\s*:\s*([A-Za-z_]\w*)((?:\s*;\s*\w+(?:[ \t]+\w+)*)*)\s*(?:=\s*(.*?))?\s*$")
+# name: [*]type[; modifiers] in a parameter list
+PARAMETER = re.compile(r"^\s*([A-Za-z_]\w*)\s*:\s*(\*?)\s*([A-Za-z_]\w*)((?:\s*;\s*\w+(?:[ \t]+\w+)*)*)\s*$")
+# [static] [inline] fn name(params) [-> [*]type[; modifiers]] [{]
+FUNCTION_HEADER = re.compile(r"^(\s*)((?:(?:static|inline|extern)\s+)*)fn\s+([A-Za-z_]\w*)\s*\((.*)\)\s*"
+                             r"(?:->\s*(\*?)\s*([A-Za-z_]\w*)((?:\s*;\s*\w+(?:[ \t]+\w+)*)*))?\s*(\{?)\s*$")
+# An expression a pointer can take the address of
+ADDRESSABLE = re.compile(r"^[A-Za-z_]\w*(?:\[[^\]]*\]|\.\w+|->\w+)*$")
+
+def declaredType(vartype, modifiers, pointer):
+    # (C type, symbol table type) for a C+ type with its modifiers.
+    # const/volatile qualify the value (the pointee for pointers), restrict qualifies the pointer:
+    # float; const; restrict  ->  "const float *restrict"
+    global runtimeNeeded
+    if vartype == "string" and pointer:
+        ctype = "char"
+    elif vartype == "string":
+        ctype = "cp_string"
+        runtimeNeeded = True
+    else:
+        ctype = modifiedType(vartype, modifiers)
+
+    symbolType = "string" if ctype == "cp_string" else ctype
+    ctype = " ".join([q for q in ["const", "volatile"] if q in modifiers] + [ctype])
+    if pointer:
+        symbolType += "*"
+        ctype += " *restrict" if "restrict" in modifiers else " *"
+    elif "restrict" in modifiers:
+        diagnostics.warning("W103", f"'restrict' only applies to pointers, ignored for type '{vartype}'")
+    return ctype, symbolType
+
+def joinDeclarator(ctype, name):
+    # "int *" + "p" -> "int *p", "int" + "x" -> "int x"
+    return ctype + name if ctype.endswith("*") else f"{ctype} {name}"
+
+def lowerScalarDeclaration(text):
+    # let* dst: float; restrict = buffer  ->  float *restrict dst = buffer
+    # let limit: int; const; long = 10     ->  const long limit = 10
+    # Returns None when the text isn't a scalar declaration.
+    match = SCALAR_DECLARATION.match(text)
+    if match is None:
+        return None
+
+    pointer, name, vartype, modifiers, value = match.groups()
+    modifiers = re.findall(r"\w+", modifiers)
+    ctype, symbolType = declaredType(vartype, modifiers, bool(pointer))
+    symbols.declare(name, symbolType)
+
+    declaration = joinDeclarator(ctype, name)
+    if "static" in modifiers:
+        declaration = "static " + declaration
+
+    if ctype.endswith("cp_string"):
+        return f"{declaration} = {stringInitializer(value)}"
+    if value is None or value == "":
+        return declaration
+
+    if pointer:
+        target = symbols.lookup(value)
+        if symbols.typeOf(value) == "string":
+            value += ".data"  # a C+ string is viewed through its buffer
+        elif value != "NULL" and ADDRESSABLE.match(value) and not (target is not None and target.kind in ["array", "function"]):
+            value = "&" + value
+    return f"{declaration} = {value}"
+
+def lowerFunctionHeader(text):
+    # inline fn dot(a: *float; const; restrict, n: int) -> float {
+    #     ->  static inline float dot(const float *restrict a, int n) {
+    # Parameters are queued for the scope the body opens; a header without "{" is a prototype and queues none.
+    # Returns None when the text isn't a function header.
+    match = FUNCTION_HEADER.match(text)
+    if match is None:
+        return None
+
+    indent, storage, name, parameters, returnPointer, returnType, returnModifiers, brace = match.groups()
+    storage = storage.split()
+    if "inline" in storage and "static" not in storage and "extern" not in storage:
+        # A plain C99 inline definition emits no symbol, so an uninlined call fails to link
+        storage.insert(0, "static")
+
+    if returnType is None:
+        ctype, symbolType = "void", "void"
+    else:
+        ctype, symbolType = declaredType(returnType, re.findall(r"\w+", returnModifiers), bool(returnPointer))
+    symbols.declare(name, symbolType, "function")
+
+    lowered = []
+    for parameter in splitTopLevel(parameters, ","):
+        parameterMatch = PARAMETER.match(parameter)
+        if parameterMatch is None:
+            lowered.append(parameter.strip())  # already C, e.g. "void" or "..."
+            continue
+        parameterName, pointer, vartype, modifiers = parameterMatch.groups()
+        parameterType, parameterSymbolType = declaredType(vartype, re.findall(r"\w+", modifiers), bool(pointer))
+        if brace:
+            pendingParameters.append((parameterName, parameterSymbolType))
+        lowered.append(joinDeclarator(parameterType, parameterName))
+
+    header = indent + " ".join(storage + [joinDeclarator(ctype, name)]) + "(" + ", ".join(p for p in lowered if p) + ")"
+    return header + (" {" if brace else "")
+
+def updateScopes(tokens):
+    # Opens and closes symbol table scopes for the braces on a line, skipping string and char literals
+    quote = None
+    for token in tokens:
+        if quote:
+            if token == quote:
+                quote = None
+        elif token in ['"', "'"]:
+            quote = token
+        elif token == "}":
+            symbols.popScope()
+        elif token == "{":
+            symbols.pushScope()
+            for name, vartype in pendingParameters:
+                symbols.declare(name, vartype, "parameter")
+            pendingParameters.clear()
+
+IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+
+# Names followed by "(" that aren't function calls
+NON_CALLS = ["if", "while", "for", "switch", "return", "sizeof", "_Alignof", "defined"]
+
+def cStringArguments(tokens):
+    # C functions take char *, so a string variable passed straight to one is passed as its
+    # NUL-terminated data: strlen(name) -> strlen(name.data). Arguments of C+ functions and cp_str_
+    # helpers stay cp_string. Indexing a string indexes its data. Elements of string arrays are
+    # treated the same way: strlen(names[i]) -> strlen(names[i].data).
+    result = list(tokens)
+    calls = []  # for each open "(", whether it is the argument list of a C function
+    previous = ""
+    quote = None
+    escaped = False
+    for i, token in enumerate(tokens):
+        if quote:
+            if escaped:
+                escaped = False
+            elif token == "\\":
+                escaped = True
+            elif token == quote:
+                quote = None
+            continue
+        if token in ['"', "'"]:
+            quote = token
+        elif token == "(":
+            function = symbols.lookup(previous)
+            calls.append(re.fullmatch(r"[A-Za-z_]\w*", previous) is not None and previous not in NON_CALLS
+                         and not previous.startswith("cp_") and (function is None or function.kind != "function"))
+        elif token == ")":
+            if calls:
+                calls.pop()
+        elif (symbols.typeOf(token) or "").startswith("string") and previous not in [".", "->"]:
+            end = elementEnd(tokens, i, symbols.typeOf(token).count("["))
+            following = next((t for t in tokens[end + 1:] if not t.isspace()), "")
+            if end >= 0 and (following == "[" or (calls and calls[-1] and previous in ["(", ","] and following in [")", ","])):
+                result[end] += ".data"
+        if not token.isspace():
+            previous = token
+    return result
+
+def elementEnd(tokens, start, dimensions):
+    # Index of the token closing the last of an array's indexes, start when it has none, -1 when the
+    # name isn't indexed through all its dimensions
+    end = start
+    for _ in range(dimensions):
+        end = next((j for j in range(end + 1, len(tokens)) if not tokens[j].isspace()), -1)
+        if end < 0 or tokens[end] != "[":
+            return -1
+        depth = 0
+        for j in range(end, len(tokens)):
+            depth += {"[": 1, "]": -1}.get(tokens[j], 0)
+            if depth == 0:
+                end = j
+                break
+        else:
+            return -1
+    return end
+
+def tokenColumn(tokens, keyword):
+    # 1-based column of a keyword in a line's tokens, 1 when it isn't there
+    if keyword not in tokens:
+        return 1
+    return sum(len(token) for token in tokens[:tokens.index(keyword)]) + 1
+
 def compileLine(tokens):
     try:
         global inMultilineComment
@@ -162,207 +1361,79 @@ def compileLine(tokens):
                     inMultilineComment = 1
         
         except Exception as e:
-            print(f"[Warning] Error processing comment tokens: {e}")
+            diagnostics.warning("W101", f"Error processing comment tokens: {e}", column=tokenColumn(tokens, "/*"))
 
         if inMultilineComment == 0:
+            isArrayDeclaration = False
+
             # ---- let statement ----
             if "let" in tokens:
                 try:
                     if '"' not in tokens[:tokens.index("let")] and tokens[:tokens.index("let")].count('"') < 2:
                         idx = tokens.index("let")
 
-                        # let* <name>: <type> = <value>
-                        if "*" in tokens:
-                            # Expect structure: let* <name>: <type> = <value>
-                            # Find variable name, colon, type
-                            try:
-                                name = tokens[idx + 3]
-                                vartype = tokens[idx + 6]
-                            except:
-                                return tokens  # malformed line
-
-                            # Replace "let" with C type
-                            if vartype in ["int", "float", "double"]:
-                                tokens[idx] = vartype
-                            
-                                del tokens[idx + 6]  # remove type
-                                del tokens[idx + 4]  # remove colon
-                                del tokens[idx + 5]
-                                
-                                if tokens[idx + 7] != "NULL":
-                                    tokens.insert(idx + 7, "&")
-
-                            # char *b = a;
-                            # let* b: string = a
-                            # Expect structure: let <name>: <type> = <value>    
-                            elif vartype == "string":
-                                tokens[idx] = "char" # Let to char
-                                tokens[idx + 1] = " "
-                                tokens[idx + 2] = "*"
-                                tokens[idx + 3] = name
-
-                                for _ in range(3):
-                                    del tokens[idx + 4]
+                        arrayDeclaration = lowerArrayDeclaration("".join(tokens[idx:]))
+
+                        # let <name>: <type>[<size>] = {<values>}
+                        if arrayDeclaration is not None:
+                            tokens = tokens[:idx] + [arrayDeclaration, ";"]
+                            isArrayDeclaration = True
 
+                        # let[*] <name>: <type>[; <modifiers>] = <value>
                         else:
-                            # Expect structure: let <name>: <type>; <unsigned>; <long/short> = <value>
-                            # Find variable name, colon, type
-                            unsignedVar = 0
-                            longShortVar = 0
-                            tempTokens = []
-                            
-                            if "unsigned" in tokens:
-                                unsignedVar = 1
-                            
-                            if "long" in tokens:
-                                if tokens[tokens.index("long") + 2] == "long":
-                                    longShortVar = 2
-                                else:
-                                    longShortVar = 1
-                            
-                            elif "short" in tokens:
-                                longShortVar = 1
-                            
-                            try:
-                                name = tokens[idx + 2]
-                                vartype = tokens[idx + 5]
-                            except:
-                                return tokens
-
-                            if vartype in ["int", "float", "double"]:
-                                tokens[idx] = vartype
-                                del tokens[idx + 4] # int <name> <type>; <unsigned>; <long/short> = <value>
-
-                                if unsignedVar == 1 or longShortVar == 1:
-                                    tempTokens.append(tokens[idx + 7])
-                                    del tokens[idx + 7] # int <name> <type>; = <value>
-                                    
-                                    for _ in range(4):
-                                        del tokens[idx + 3]
-
-                                    tokens.insert(idx, " ")
-                                    tokens.insert(idx, tempTokens[0])
-
-                                    if unsignedVar + longShortVar == 2 and longShortVar != 2:
-                                        # unsigned int a; long = 4;
-                                        tokens.insert(idx + 2, tokens[idx + 7])
-                                        tokens.insert(idx + 3, " ")
-
-                                        for _ in range(3):
-                                            del tokens[idx + 7]
-                                    
-                                    elif longShortVar == 2:
-                                        # unsigned int a; long long = 4;
-                                        tokens.insert(idx + 2, "long")
-                                        tokens.insert(idx + 3, " ")
-                                        tokens.insert(idx + 4, "long")
-                                        tokens.insert(idx + 5, " ") # unsigned long long int a; long long = 4;
-                                        
-                                        for _ in range(5):
-                                            del tokens[idx + 9]
-
-                                else:
-                                    del tokens[4]
-                                    del tokens[4]
-
-                                if longShortVar == 2 and unsignedVar == 0:
-                                    # unsigned int a; long long = 4;
-                                    tokens.insert(idx, "long")
-                                    tokens.insert(idx + 1, " ")
-                                    tokens.insert(idx + 2, "long")
-                                    tokens.insert(idx + 3, " ") # unsigned long long int a; long long = 4;
-
-                                    for _ in range(7):
-                                        del tokens[idx + 7]
-
-                            elif "string" in tokens:
-                                # let x: string; unsigned = 1
-                                tokens[idx] = "char"
-                                
-                                if "=" in tokens:
-                                    print("true")
-                                    tokens[idx + 3] = "[]" # char x[] string; unsigned = 1
-                                else:
-                                    del tokens[idx + 3]
-                                    if len(tokens) >= idx + 4:
-                                        del tokens[idx + 3]
-                                        del tokens[idx + 3]
-
-                                if unsignedVar == 1: 
-                                    del tokens[idx + 4]
-                                    del tokens[idx + 4] # char x[]; unsigned = 1
-
-                                if unsignedVar == 1:
-                                    for _ in range(3):
-                                        del tokens[idx + 4]
-                                    tokens.insert(idx, "unsigned")
-                                    tokens.insert(idx + 1, " ")
+                            declaration = lowerScalarDeclaration("".join(tokens[idx:]))
+                            if declaration is not None:
+                                tokens = tokens[:idx] + [declaration]
+
+                except Exception as e:
+                    diagnostics.warning("W101", f"Error processing 'let' statement: {e}", column=tokenColumn(tokens, "let"))
 
+            # ---- string assignment ----
+            elif "=" in tokens:
+                try:
+                    assignment = lowerStringAssignment("".join(tokens))
+                    if assignment is not None:
+                        tokens = [assignment]
                 except Exception as e:
-                    print(f"[Warning] Error processing 'let' statement: {e}")
+                    diagnostics.warning("W101", f"Error processing string assignment: {e}", column=tokenColumn(tokens, "="))
 
             # ---- function keyword ----
             if "fn" in tokens:
                 try:
                     if '"' not in tokens[:tokens.index("fn")] and tokens[:tokens.index("fn")].count('"') < 2:
-                        if "->" in tokens:
-                            start = tokens.index("fn")
-                            tokens[tokens.index("fn")] = "int"
-
-                            indexOfArrow = tokens.index("->")
-
-                            for _ in range(3):
-                                del tokens[indexOfArrow]
-
-                        else:
-                            tokens[tokens.index("fn")] = "void"
-                        
-                        # Find the opening parenthesis
-                        start = tokens.index("(") + 1
-                        
-                        # Process each parameter by moving type before name
-                        # Expected input format: name: type, name: type, ...
-                        # Desired output format: type name, type name, ...
-                        i = start
-                        while i < len(tokens):
-                            # Look for the pattern: name : type
-                            if i + 2 < len(tokens) and tokens[i + 1] == ":":
-                                name = tokens[i]
-                                vartype = tokens[i + 3]
-
-                                if vartype == "string":
-                                    vartype = "char"
-                                
-                                # Replace with: type name
-                                tokens[i] = vartype
-                                tokens[i + 1] = " "
-                                tokens[i + 2] = name
-                                
-                                del tokens[i + 3]
-
-                                # Move past this parameter (type, space, name, comma/paren)
-                                i += 3
-                                
-                                # Skip comma and whitespace if present
-                                while i < len(tokens) and tokens[i] in [",", " "]:
-                                    i += 1
-                            else:
-                                i += 1
-                            
+                        header = lowerFunctionHeader("".join(tokens))
+                        if header is not None:
+                            tokens = regexEngine(header)
                 except Exception as e:
-                    print(f"[Warning] Error processing 'fn' statement: {e}")
+                    diagnostics.warning("W101", f"Error processing 'fn' statement: {e}", column=tokenColumn(tokens, "fn"))
 
+            # ---- loops and conditions ----
+            if "for" in tokens or "while" in tokens or "if" in tokens:
+                try:
+                    text = "".join(tokens)
+                    lowered = lowerRangeLoop(text) or lowerCondition(text)
+                    if lowered is not None:
+                        tokens = regexEngine(lowered)
                 except Exception as e:
-                    print(f"[Warning] Error processing 'fn' statement: {e}")
+                    column = min(tokenColumn(tokens, keyword) for keyword in ["for", "while", "if"])
+                    diagnostics.warning("W101", f"Error processing loop or condition: {e}", column=column)
 
             # ---- print keyword ----
             if "print" in tokens:
                 try:
-                    if '"' not in tokens[:tokens.index("print")] and not tokens[:tokens.index("print")].count('"') < 2:
-                        print(tokens)
-                        tokens[tokens.index("print")] = "printf"
+                    idx = tokens.index("print")
+                    if tokens[:idx].count('"') % 2 == 0:
+                        prefix = "".join(tokens[:idx])
+                        rest = "".join(tokens[idx + 1:])
+                        lowered = lowerPrint(rest, tokenColumn(tokens, "print"))
+
+                        if lowered is not None:
+                            call, remainder = lowered
+                            tokens = [t for t in [prefix, call, remainder] if t != ""]
+                        else:
+                            tokens[idx] = "printf"
                 except Exception as e:
-                    print(f"[Warning] Error processing 'print' statement: {e}")
+                    diagnostics.warning("W101", f"Error processing 'print' statement: {e}", column=tokenColumn(tokens, "print"))
 
             # ---- import ----
             if "import" in tokens:
@@ -378,22 +1449,718 @@ def compileLine(tokens):
                             except IndexError as e:
                                 tokens.append(">")
                         else:
-                            print(f"[Warning] Malformed 'import' statement - not enough tokens")
+                            diagnostics.warning("W102", "Malformed 'import' statement - not enough tokens",
+                                                column=tokenColumn(tokens, "import"))
                 except Exception as e:
-                    print(f"[Warning] Error processing 'import' statement: {e}") 
+                    diagnostics.warning("W101", f"Error processing 'import' statement: {e}", column=tokenColumn(tokens, "import"))
+
+            try:
+                # Lowered statements can be single tokens, so the line is split again to find the arguments
+                text = "".join(tokens)
+                if any((symbols.typeOf(name) or "").startswith("string") for name in IDENTIFIER.findall(text)):
+                    converted = cStringArguments(regexEngine(text))
+                    if "".join(converted) != text:
+                        tokens = converted
+            except Exception as e:
+                diagnostics.warning("W101", f"Error passing strings to C: {e}")
+
+            if boundsChecks and not isArrayDeclaration:
+                checked = insertBoundsChecks("".join(tokens))
+                if checked != "".join(tokens):
+                    tokens = regexEngine(checked)
+
+            updateScopes(tokens)
 
             # append semicolon if missing
             noSemicolon = ["ifdef", "else", "endif"]
-            if tokens[len(tokens) - 1] not in [";", "{", "}", ">", "/*", "*/"] and not any(noSemicolon[i] in tokens for i in range(3)):
+            isDirective = "".join(tokens).lstrip().startswith("#")
+            if tokens[len(tokens) - 1] not in [";", "{", "}", ">", "/*", "*/"] and not any(noSemicolon[i] in tokens for i in range(3)) and not isDirective:
                 tokens.append(";")
 
         # newline always
         tokens.append("\n")
         return tokens
     except Exception as e:
-        print(f"[Error] Unexpected error in compileLine: {e}")
+        diagnostics.error("E102", f"Unexpected error in compileLine: {e}")
         return ["\n"]
 
+# ---------------- STRUCTS ----------------
+# struct [packed|ordered] Name {
+#     name: type
+#     let* next: Name
+# }
+# Fields are sorted by alignment to remove padding unless "packed" or "ordered" keeps declaration order.
+
+STRUCT_HEADER = re.compile(r"^(\s*)struct\s+(?:(packed|ordered)\s+)?([A-Za-z_]\w*)\s*\{\s*$")
+STRUCT_FIELD = re.compile(r"^(\s*)(?:let(\*)?\s+)?([A-Za-z_]\w*)\s*:\s*(\*?)\s*([A-Za-z_]\w*)\s*((?:\[[^\]]+\]\s*)*)((?:;[\w\s]+)*?)\s*;?\s*$")
+
+POINTER_SIZE = 8 if sys.maxsize > 2 ** 32 else 4
+
+# (size, alignment) of every struct declared so far, by name
+structLayouts = {}
+# Field types of every struct declared so far, by struct name then field name, as the symbol table records them
+structFields = {}
+
+def fieldLayout(vartype, ctype, pointer, dims):
+    # (size, alignment) of a field, or None when the type's layout isn't known
+    if pointer:
+        size = align = POINTER_SIZE
+    elif vartype == "string":
+        size, align = 3 * POINTER_SIZE, POINTER_SIZE
+    elif vartype in structLayouts:
+        if structLayouts[vartype] is None:
+            return None  # a struct that itself has a field of unknown size
+        size, align = structLayouts[vartype]
+    elif ctype.replace("unsigned ", "") in TYPE_SIZES:
+        size = align = TYPE_SIZES[ctype.replace("unsigned ", "")]
+    else:
+        return None
+
+    for dim in dims:
+        if not dim.isdigit():
+            return None
+        size *= int(dim)
+    return size, align
+
+def structSize(layouts, packed=False):
+    # C layout of fields in the given order: (total size, alignment)
+    offset = 0
+    maxAlign = 1
+    for size, align in layouts:
+        if packed:
+            align = 1
+        offset = (offset + align - 1) // align * align + size
+        maxAlign = max(maxAlign, align)
+    return (offset + maxAlign - 1) // maxAlign * maxAlign, maxAlign
+
+def lowerStruct(lines):
+    # Lowers a collected struct declaration into (cpx line, C text) entries.
+    # Field lines keep their own .cpx line numbers, so reordered fields still map back for gdb.
+    headerLine, header = lines[0]
+    indent, mode, name = STRUCT_HEADER.match(header).groups()
+    closed = len(lines) > 1 and lines[-1][1].strip() in ["}", "};"]
+    body = lines[1:-1] if closed else lines[1:]
+
+    global runtimeNeeded
+    fields = []
+    slots = []
+    entries = {}
+    types = structFields[name] = {}
+    for n, text in body:
+        diagnostics.line = n
+        match = STRUCT_FIELD.match(text)
+        if match is None:
+            # Blank lines and comments stay where they are
+            entries[n] = "".join(compileLine(regexEngine(text)))
+            continue
+
+        fieldIndent, letPointer, fieldName, starPointer, vartype, dims, modifiers = match.groups()
+        pointer = bool(letPointer or starPointer)
+        dims = [dim.strip() for dim in re.findall(r"\[([^\]]+)\]", dims)]
+        ctype = modifiedType(vartype, re.findall(r"\w+", modifiers))
+        if vartype == "string":
+            ctype = "cp_string"
+            runtimeNeeded = True
+        elif vartype in structLayouts or vartype == name:
+            ctype = f"struct {vartype}"  # the typedef doesn't exist yet inside its own struct
+
+        declaration = f"{ctype} {'*' if pointer else ''}{fieldName}" + "".join(f"[{dim}]" for dim in dims)
+        fieldType = "char" if vartype == "string" and pointer else "string" if vartype == "string" else \
+            vartype if ctype.startswith("struct ") else ctype
+        types[fieldName] = fieldType + ("*" if pointer else "") + "".join(f"[{dim}]" for dim in dims)
+        fields.append((n, fieldIndent, declaration, fieldLayout(vartype, ctype, pointer, dims)))
+        slots.append(n)
+
+    layouts = [layout for _, _, _, layout in fields]
+    ordered = list(fields)
+    if None in layouts:
+        if mode is None:
+            diagnostics.warning("W105", f"struct {name}: unknown field type, keeping declaration order", headerLine)
+    elif mode is None:
+        # Stable sort: fields of equal alignment keep their relative order
+        ordered = sorted(fields, key=lambda field: field[3][1], reverse=True)
+
+    for slot, (n, fieldIndent, declaration, _) in zip(slots, ordered):
+        entries[slot] = (n, f"{fieldIndent}{declaration};\n")
+
+    if None not in layouts:
+        before, _ = structSize(layouts)
+        size, align = structSize([field[3] for field in ordered], mode == "packed")
+        structLayouts[name] = (size, 1 if mode == "packed" else align)
+        diagnostics.info("I101", f"struct {name}: {size} bytes, {before - size} bytes of padding saved", headerLine)
+    else:
+        structLayouts[name] = None
+
+    symbols.declare(name, name, "struct")
+
+    attribute = "__attribute__((packed)) " if mode == "packed" else ""
+    result = [(headerLine, f"{indent}typedef struct {attribute}{name} {{\n")]
+    for n, _ in body:
+        entry = entries[n]
+        result.append(entry if isinstance(entry, tuple) else (n, entry))
+    if closed:
+        result.append((lines[-1][0], f"{indent}}} {name};\n"))
+    return result
+
+# ---------------- LOOPS ----------------
+# for i in 0..n [step s] {          ->  for (int i = 0; i < n; i++) {
+# for i in reverse 0..n [step s] {  ->  for (int i = n; i-- > 0; ) {
+# while i < n {                     ->  while (i < n) {
+# if / else if conditions don't need parentheses either.
+
+RANGE_LOOP = re.compile(r"^(\s*)for\s+([A-Za-z_]\w*)\s+in\s+(reverse\s+)?(.+?)\s*\.\.\s*(.+?)(?:\s+step\s+(.+?))?\s*\{\s*$")
+CONDITION_KEYWORD = re.compile(r"^(\s*(?:\}\s*)?(?:else\s+)?)(if|while)\b\s*(.*?)\s*(\{?)\s*$")
+
+# Integer types in conversion rank order, for picking a loop index wide enough for its bounds
+INDEX_TYPES = ["int", "unsigned int", "long", "unsigned long", "long long", "unsigned long long"]
+
+def boundType(bound):
+    # C integer type of a loop bound, None when it can't be told from the text
+    literal = re.fullmatch(r"(0[xX][0-9a-fA-F]+|0[0-7]*|[1-9]\d*)[uUlL]*", bound)
+    if literal is not None:
+        digits = literal.group(1)
+        value = int(digits, 8) if digits.startswith("0") and digits[1:2].isdigit() else int(digits, 0)
+        if value < 2 ** 31:
+            return "int"
+        return "long long" if value < 2 ** 63 else "unsigned long long"
+
+    try:
+        value = evaluateConstant(bound)
+        if isinstance(value, int):
+            return "int"
+    except (NotConstant, ValueError, OverflowError, ZeroDivisionError):
+        pass
+
+    declared = expressionType(bound)
+    if declared == "size_t":
+        return "unsigned long"
+    if declared in PROMOTED_TYPES:
+        return "int"
+    return declared if declared in INDEX_TYPES else None
+
+def indexType(bounds):
+    # Narrowest index type every bound converts to without loss, like C's usual arithmetic conversions
+    types = [boundType(bound) for bound in bounds]
+    if None in types:
+        return f"__typeof__({' + '.join(f'({bound})' for bound in bounds)})"
+    return max(types, key=INDEX_TYPES.index)
+
+def isSimpleBound(bound):
+    # Literals and plain names are cheap to re-read every iteration, anything else is hoisted
+    return re.fullmatch(r"[A-Za-z_]\w*|-?\d+[uUlL]*|0[xX][0-9a-fA-F]+[uUlL]*", bound) is not None
+
+def lowerRangeLoop(text):
+    # Lowers a range loop header to a counted C for loop, None when the text isn't one.
+    # The index is declared for the loop body's scope; non-trivial bounds are evaluated once.
+    match = RANGE_LOOP.match(text)
+    if match is None:
+        return None
+
+    indent, name, reverse, low, high, step = match.groups()
+    ctype = indexType([low, high])
+    pendingParameters.append((name, ctype))
+
+    declarations = []
+    def hoisted(bound, suffix):
+        if isSimpleBound(bound):
+            return bound
+        declarations.append(f"cp_{suffix}_{name} = {bound}")
+        return f"cp_{suffix}_{name}"
+
+    if step is not None and step.strip() in ["1", "1u", "1U"]:
+        step = None
+
+    if not reverse:
+        end = hoisted(high, "end")
+        increment = f"{name}++" if step is None else f"{name} += {step}"
+        header = f"{name} = {low}; {name} < {end}; {increment}"
+    elif step is None:
+        # Post-decrement test works for unsigned indices too: it never steps below the low bound
+        end = hoisted(low, "end")
+        header = f"{name} = {high}; {name}-- > {end}; "
+    else:
+        end = hoisted(low, "end")
+        top = hoisted(high, "top")
+        if ctype in INDEX_TYPES and INDEX_TYPES.index(ctype) % 2 == 0:
+            header = f"{name} = {top} - 1; {name} >= {end}; {name} -= {step}"
+        else:
+            # An unsigned index wraps past zero instead of going below the low bound
+            guard = f"{name} < {top}" if end == "0" else f"{name} >= {end} && {name} < {top}"
+            header = f"{name} = {top} - 1; {guard}; {name} -= {step}"
+
+    first, rest = header.split(";", 1)
+    # A stepped reverse loop starts from its hoisted top bound, which has to be declared before the index
+    declarators = [first] + declarations
+    if any(declaration.split(" = ")[0] in first for declaration in declarations):
+        declarators = declarations + [first]
+    return f"{indent}for ({ctype} {', '.join(declarators)};{rest}) {{"
+
+def lowerCondition(text):
+    # if x > 0 {  ->  if (x > 0) {, the same for else if, while and "} while x" closing a do loop
+    match = CONDITION_KEYWORD.match(text)
+    if match is None:
+        return None
+
+    prefix, keyword, condition, brace = match.groups()
+    if condition == "" or "{" in condition or (keyword == "while" and not brace and not prefix.strip().startswith("}")):
+        return None
+    if condition.startswith("(") and matchingParen(condition, 0) == len(condition) - 1:
+        return None  # already C
+    return f"{prefix}{keyword} ({condition})" + (" {" if brace else "")
+
+# ---------------- OPTIMISATION PASS ----------------
+# Runs over the translated lines before they are written: folds constant arithmetic and removes
+# if blocks and platform conditionals whose outcome is known at compile time.
+
+CONSTANT_TOKEN = re.compile(r"""
+    \s*(
+        0[xX][0-9a-fA-F]+(?![\w.])             | # hex
+        (?:\d+\.\d*|\.\d+)(?:[eE][+-]?\d+)?(?![\w.]) | # float
+        \d+[eE][+-]?\d+(?![\w.])               | # float with exponent only
+        \d+(?![\w.])                           | # decimal or octal
+        <<|>>|<=|>=|==|!=|&&|\|\|              | # two-char operators
+        [-+*/%<>&|^~!()]                         # one-char operators
+    )""", re.VERBOSE)
+
+BINARY_PRECEDENCE = {
+    "*": 10, "/": 10, "%": 10,
+    "+": 9, "-": 9,
+    "<<": 8, ">>": 8,
+    "<": 7, "<=": 7, ">": 7, ">=": 7,
+    "==": 6, "!=": 6,
+    "&": 5,
+    "^": 4,
+    "|": 3,
+    "&&": 2,
+    "||": 1,
+}
+
+INT_MIN = -2 ** 31
+INT_MAX = 2 ** 31 - 1
+
+class NotConstant(Exception):
+    pass
+
+def tokenizeConstant(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = CONSTANT_TOKEN.match(text, pos)
+        if match is None:
+            raise NotConstant(text[pos:])
+        tokens.append(match.group(1))
+        pos = match.end()
+    return tokens
+
+def parseLiteral(token):
+    if token.lower().startswith("0x"):
+        value = int(token, 16)
+    elif re.fullmatch(r"\d+", token):
+        value = int(token, 8) if len(token) > 1 and token.startswith("0") else int(token)
+    else:
+        return float(token)
+    if value > INT_MAX:
+        raise NotConstant(token)  # wider than int in C, leave it to gcc
+    return value
+
+def checkInt(value):
+    # Folding must never hide int overflow, which C leaves undefined
+    if isinstance(value, int) and not INT_MIN <= value <= INT_MAX:
+        raise NotConstant(value)
+    return value
+
+def applyBinary(op, left, right):
+    isFloat = isinstance(left, float) or isinstance(right, float)
+    if op in ["+", "-", "*"]:
+        return checkInt({"+": left + right, "-": left - right, "*": left * right}[op])
+    if op in ["/", "%"]:
+        if right == 0:
+            raise NotConstant("division by zero")
+        if isFloat:
+            if op == "%":
+                raise NotConstant("% on floating point")
+            return left / right
+        quotient = abs(left) // abs(right) * (1 if (left < 0) == (right < 0) else -1)
+        return checkInt(quotient if op == "/" else left - right * quotient)
+    if op in ["<", "<=", ">", ">=", "==", "!="]:
+        return int({"<": left < right, "<=": left <= right, ">": left > right,
+                    ">=": left >= right, "==": left == right, "!=": left != right}[op])
+    if op in ["&&", "||"]:
+        return int(bool(left) and bool(right)) if op == "&&" else int(bool(left) or bool(right))
+    if isFloat:
+        raise NotConstant(f"{op} on floating point")
+    if op in ["<<", ">>"]:
+        if right < 0 or right >= 32 or (op == "<<" and left < 0):
+            raise NotConstant("undefined shift")
+        return checkInt(left << right if op == "<<" else left >> right)
+    return {"&": left & right, "^": left ^ right, "|": left | right}[op]
+
+def evaluateConstant(text):
+    # Evaluates a C integer/floating constant expression with C precedence and semantics.
+    # Raises NotConstant for anything that isn't one, or that C would treat as undefined.
+    tokens = tokenizeConstant(text)
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def unary():
+        nonlocal pos
+        token = peek()
+        if token is None:
+            raise NotConstant(text)
+        pos += 1
+        if token == "(":
+            value = binary(0)
+            if peek() != ")":
+                raise NotConstant(text)
+            pos += 1
+            return value
+        if token in ["-", "+", "~", "!"]:
+            value = unary()
+            if token == "-":
+                return checkInt(-value)
+            if token == "+":
+                return value
+            if token == "!":
+                return int(not value)
+            if isinstance(value, float):
+                raise NotConstant("~ on floating point")
+            return ~value
+        if token in BINARY_PRECEDENCE or token == ")":
+            raise NotConstant(text)
+        return parseLiteral(token)
+
+    def binary(minPrecedence):
+        nonlocal pos
+        left = unary()
+        while peek() in BINARY_PRECEDENCE and BINARY_PRECEDENCE[peek()] > minPrecedence:
+            op = peek()
+            pos += 1
+            right = binary(BINARY_PRECEDENCE[op])
+            left = applyBinary(op, left, right)
+        return left
+
+    value = binary(0)
+    if pos != len(tokens):
+        raise NotConstant(text)
+    return value
+
+def foldExpression(text):
+    # Folded C text for a constant expression, or None if it isn't constant or nothing changes
+    if not re.search(r"[-+*/%<>&|^~!]", text):
+        return None
+    try:
+        value = evaluateConstant(text)
+    except (NotConstant, ValueError, OverflowError):
+        return None
+    folded = repr(value)
+    if folded in ["inf", "-inf", "nan"] or folded == text.strip():
+        return None
+    return folded
+
+def foldLine(text):
+    # Folds the value of "x = <const>;", "return <const>;" and the condition of "if (<const>) {"
+    match = re.match(r"^(.*?(?<![=!<>+\-*/%&|^])=(?!=)\s*)(.+?)(\s*;\s*)$", text)
+    if match is None:
+        match = re.match(r"^(\s*return\s+)(.+?)(\s*;\s*)$", text)
+    if match is None:
+        match = re.match(r"^(\s*(?:\}\s*else\s+)?if\s*\()(.+)(\)\s*\{\s*)$", text)
+    if match is None:
+        return text
+
+    folded = foldExpression(match.group(2))
+    if folded is None:
+        return text
+    return match.group(1) + folded + match.group(3)
+
+def countBraces(text):
+    # Net "{" minus "}" outside string and char literals
+    depth = 0
+    quote = None
+    i = 0
+    while i < len(text):
+        ch = text[i]
+        if quote:
+            if ch == "\\":
+                i += 1
+            elif ch == quote:
+                quote = None
+        elif ch in "\"'":
+            quote = ch
+        elif ch == "/" and text[i + 1:i + 2] == "/":
+            break
+        elif ch == "{":
+            depth += 1
+        elif ch == "}":
+            depth -= 1
+        i += 1
+    return depth
+
+def blockEnd(lines, start):
+    # Index of the line closing the block opened at the end of lines[start], or -1.
+    # Only blocks that close on a line of their own ("}" or "} else ... {") are handled.
+    depth = 1
+    for i in range(start + 1, len(lines)):
+        text = lines[i]
+        if text is None:
+            continue
+        if depth == 1 and re.match(r"^\s*\}\s*(else\b.*\{)?\s*$", text):
+            return i
+        depth += countBraces(text)
+        if depth <= 0:
+            return -1
+    return -1
+
+def eliminateDeadBranches(lines):
+    # Resolves "if (0) {" / "if (1) {" chains whose conditions have already been folded, in place.
+    # Removed lines become None; a taken branch keeps its braces as a plain block for scoping.
+    i = 0
+    while i < len(lines):
+        text = lines[i]
+        match = re.match(r"^(\s*)if\s*\(\s*(-?\d+)\s*\)\s*\{\s*$", text) if text is not None else None
+        end = blockEnd(lines, i) if match else -1
+        if end == -1:
+            i += 1
+            continue
+
+        indent, taken = match.group(1), int(match.group(2)) != 0
+        tail = re.match(r"^\s*\}\s*else\s*(.*)$", lines[end])
+
+        if taken:
+            lines[i] = indent + "{\n"
+            header = end
+            while tail:
+                # Drop each following else branch of the chain
+                elseEnd = blockEnd(lines, header)
+                if elseEnd == -1:
+                    break
+                tail = re.match(r"^\s*\}\s*else\b", lines[elseEnd])
+                for j in range(header + 1, elseEnd + 1):
+                    lines[j] = None
+                header = elseEnd
+            if header != end:
+                lines[end] = indent + "}\n"
+        else:
+            for j in range(i, end):
+                lines[j] = None
+            if tail:
+                # "} else {" becomes "{", "} else if (...) {" becomes the new head of the chain
+                rest = tail.group(1)
+                lines[end] = indent + ("{\n" if rest.startswith("{") else rest.rstrip() + "\n")
+                i = end
+                continue
+            lines[end] = None
+        i += 1
+
+def conditionValue(directive, expression, known):
+    # 1/0 for a preprocessor condition made only of known macros and constants, else None
+    if directive in ["ifdef", "ifndef"]:
+        name = expression.strip()
+        if name not in known:
+            return None
+        return int(known[name] == (directive == "ifdef"))
+
+    def replaceDefined(match):
+        name = match.group(1) or match.group(2)
+        if name not in known:
+            raise NotConstant(name)
+        return "1" if known[name] else "0"
+
+    try:
+        expression = re.sub(r"defined\s*\(\s*(\w+)\s*\)|defined\s+(\w+)", replaceDefined, expression)
+        return int(bool(evaluateConstant(expression)))
+    except (NotConstant, ValueError, OverflowError):
+        return None
+
+def resolveConditionals(lines, known):
+    # Resolves #if/#ifdef/#ifndef chains whose conditions only use known macros, in place
+    directive = re.compile(r"^\s*#\s*(ifdef|ifndef|if|elif|else|endif)\b\s*(.*?)\s*$")
+    i = 0
+    while i < len(lines):
+        match = directive.match(lines[i]) if lines[i] is not None else None
+        if match is None or match.group(1) not in ["ifdef", "ifndef", "if"]:
+            i += 1
+            continue
+
+        # Collect this chain's branch headers at nesting depth 0
+        branches = [(i, match.group(1), match.group(2))]
+        depth = 0
+        end = -1
+        for j in range(i + 1, len(lines)):
+            inner = directive.match(lines[j]) if lines[j] is not None else None
+            if inner is None:
+                continue
+            kind = inner.group(1)
+            if kind in ["ifdef", "ifndef", "if"]:
+                depth += 1
+            elif kind == "endif" and depth > 0:
+                depth -= 1
+            elif depth == 0 and kind == "endif":
+                end = j
+                break
+            elif depth == 0:
+                branches.append((j, kind, inner.group(2)))
+
+        values = [1 if kind == "else" else conditionValue("if" if kind == "elif" else kind, expr, known)
+                  for _, kind, expr in branches]
+        if end == -1 or None in values:
+            i += 1
+            continue
+
+        taken = values.index(1) if 1 in values else -1
+        bounds = [index for index, _, _ in branches] + [end]
+        for b in range(len(branches)):
+            lines[bounds[b]] = None
+            if b != taken:
+                for j in range(bounds[b] + 1, bounds[b + 1]):
+                    lines[j] = None
+        lines[end] = None
+        i += 1
+
+def hostMacros(lines):
+    # Platform macros gcc will define on this machine, unless the file sets them itself
+    known = {
+        "_WIN32": is_windows(),
+        "__linux__": sys.platform.startswith("linux"),
+        "__APPLE__": sys.platform == "darwin",
+    }
+    for text in lines:
+        match = re.match(r"^\s*#\s*(?:define|undef)\s+(\w+)", text or "")
+        if match:
+            known.pop(match.group(1), None)
+    return known
+
+def optimizeEntries(entries, hostBuild=True):
+    # Optimisation pass over translated (cpx line, text) entries, returns the surviving entries.
+    # Platform conditionals are only resolved when the C is compiled here (hostBuild), so
+    # translate-only (-c) output stays portable.
+    lines = [text for _, text in entries]
+
+    resolveConditionals(lines, hostMacros(lines) if hostBuild else {})
+    lines = [foldLine(text) if text is not None else None for text in lines]
+    eliminateDeadBranches(lines)
+
+    return [(entry[0], text) for entry, text in zip(entries, lines) if text is not None]
+
+def lineDirective(cpxLine, sourceName):
+    # #line marker so gcc, gdb, perf and gprof report .cpx file and line numbers
+    escaped = sourceName.replace("\\", "\\\\").replace('"', '\\"')
+    return f'#line {cpxLine} "{escaped}"\n'
+
+def emitLines(entries, sourceName, leadingDirective=False):
+    # entries is a list of (cpx line number or None for generated code, compiled text).
+    # Returns the C lines and a source map where sourceMap[i] is the .cpx line of C line i + 1.
+    # Whenever a transformation added or removed lines, a #line marker re-synchronises the numbering
+    # with the .cpx file; leadingDirective (-l) also names the .cpx file from the very first line.
+    output = []
+    sourceMap = []
+    expected = 1
+
+    # Generated lines at the top are followed by a marker anyway
+    if leadingDirective and entries and entries[0][0] is not None:
+        output.append(lineDirective(1, sourceName))
+        sourceMap.append(None)
+
+    for cpxLine, text in entries:
+        for physical in text.splitlines(keepends=True):
+            if cpxLine is not None and cpxLine != expected:
+                output.append(lineDirective(cpxLine, sourceName))
+                sourceMap.append(None)
+                expected = cpxLine
+
+            output.append(physical)
+            sourceMap.append(cpxLine)
+            expected += 1
+
+    return output, sourceMap
+
+def translateLines(lines, sourceName, lineDirectives=False, optimize=True, hostBuild=True, checked=False, lineTimes=None):
+    # Translates C+ source lines (None for a line that couldn't be read) and returns (C lines, source map).
+    # lineTimes, when given a list, receives (line number, seconds) for every line or struct translated.
+    # Problems are added to the diagnostics buffer; the caller clears and flushes it.
+    global inMultilineComment, runtimeNeeded, boundsChecks
+    translateStart = time.perf_counter()
+    diagnostics.source = sourceName
+    inMultilineComment = 0
+    runtimeNeeded = False
+    boundsChecks = checked
+    structLayouts.clear()
+    structFields.clear()
+    symbols.clear()
+    pendingParameters.clear()
+
+    entries = []
+    structBody = None
+    for n, line in enumerate(lines, start=1):
+        if line is None:
+            continue
+        symbols.currentLine = n
+        diagnostics.line = n
+        start = time.perf_counter() if lineTimes is not None else 0
+
+        # struct declarations are collected whole so their fields can be laid out together
+        if structBody is not None:
+            structBody.append((n, line))
+            if line.strip() in ["}", "};"]:
+                entries.extend(lowerStruct(structBody))
+                structBody = None
+                if lineTimes is not None:
+                    lineTimes.append((n, time.perf_counter() - start))
+            continue
+        if inMultilineComment == 0 and STRUCT_HEADER.match(line):
+            structBody = [(n, line)]
+            continue
+
+        tokens = regexEngine(line)
+        compiled = compileLine(tokens)
+        entries.append((n, "".join(compiled)))
+        if lineTimes is not None:
+            lineTimes.append((n, time.perf_counter() - start))
+
+    if structBody is not None:
+        diagnostics.warning("W104", "struct is never closed", structBody[0][0])
+        entries.extend(lowerStruct(structBody))
+    diagnostics.line = None
+
+    if runtimeNeeded:
+        # Generated line, emitLines re-synchronises the numbering after it
+        entries.insert(0, (None, '#include "cplus.h"\n'))
+    diagnostics.time("translate", time.perf_counter() - translateStart)
+
+    if optimize:
+        start = time.perf_counter()
+        entries = optimizeEntries(entries, hostBuild)
+        diagnostics.time("optimise", time.perf_counter() - start)
+
+    return emitLines(entries, sourceName, lineDirectives)
+
+def translateFile(filename, cfilepath, lineDirectives=False, optimize=True, hostBuild=True, checked=False):
+    # Translates a .cpx file into cfilepath, returns the source map or None if the input can't be read.
+    # Starts a fresh diagnostics buffer for the file.
+    diagnostics.clear(os.path.basename(filename))
+
+    # remove old output
+    try:
+        if os.path.exists(cfilepath):
+            os.remove(cfilepath)
+    except Exception as e:
+        diagnostics.warning("W001", f"Could not remove old output file '{cfilepath}': {e}")
+
+    start = time.perf_counter()
+    lines = readLines(filename)
+    diagnostics.time("read", time.perf_counter() - start)
+
+    if lines is None:
+        return None
+    output, sourceMap = translateLines(lines, os.path.basename(filename), lineDirectives, optimize, hostBuild, checked)
+    start = time.perf_counter()
+    writeFile(output, cfilepath)
+    diagnostics.time("write", time.perf_counter() - start)
+
+    return sourceMap
+
 def main():
     try:
         if sys.argv:
@@ -412,9 +2179,31 @@ def main():
             sys.exit(1)
         
         args = sys.argv
-        
-        global inMultilineComment
-        inMultilineComment = 0
+        mode = None
+
+        # Language server for editors: cpx lsp (JSON-RPC over stdin/stdout)
+        if args[1] == "lsp":
+            import lsp
+            lsp.main()
+            return
+
+        # Distributed builds: cpx build <a.cpx> [b.cpx ...] [options], cpx worker [--listen address] [-j slots]
+        if args[1] in ["build", "worker"]:
+            import buildfarm
+            if args[1] == "build":
+                buildfarm.buildMain(args[2:])
+            else:
+                buildfarm.workerMain(args[2:])
+            return
+
+        # Subcommands: cpx bench|profile <filename.cpx> [options]
+        if args[1] in ["bench", "profile"]:
+            mode = args[1]
+            args = [args[0]] + args[2:]
+
+            if len(args) < 2:
+                print(f"[Error] Usage: cpc {mode} <filename.cpx> [options]")
+                sys.exit(1)
 
         filename = args[1]
 
@@ -428,28 +2217,25 @@ def main():
 
         cfilepath = filename[:-3] + "c"
 
-        # remove old output
-        try:
-            if os.path.exists(cfilepath):
-                os.remove(cfilepath)
-        except Exception as e:
-            print(f"[Warning] Could not remove old output file '{cfilepath}': {e}")
+        lineDirectives = "-l" in args or mode == "profile"
 
-        numLines = countLines(filename)
-        
-        if numLines == -1:
+        sourceMap = translateFile(filename, cfilepath, lineDirectives, "--no-fold" not in args, "-c" not in args,
+                                  "--checked" in args)
+        failed = diagnostics.hasErrors()
+        flushDiagnostics(args)
+        if sourceMap is None:
             print("[Error] Failed to read input file")
             sys.exit(1)
+        if failed:
+            print(f"[Error] Translation of '{filename}' failed, not compiling")
+            sys.exit(1)
 
-        for n in range(1, numLines + 1):
-            line = getLine(filename, n)
-            if line is None:
-                continue
-            tokens = regexEngine(line)
-            compiled = compileLine(tokens)
-            writeFile(compiled, cfilepath)
-
-        compileC(cfilepath, args)
+        if mode == "bench":
+            benchmarkProgram(cfilepath, args)
+        elif mode == "profile":
+            profileProgram(cfilepath, args)
+        else:
+            compileC(cfilepath, args)
         
     except KeyboardInterrupt:
         print("\n[Error] Compilation interrupted by user")
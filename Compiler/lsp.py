@@ -0,0 +1,395 @@
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+from urllib.parse import unquote, urlparse
+
+import compiler
+
+# Language server for the VS Code extension, started with "cpx lsp". Speaks JSON-RPC over stdin/stdout.
+# Every open document keeps its lines and what each line translated to. An edit retranslates only the
+# lines it touched, plus lines whose translator state or the declarations they refer to changed; every
+# other line just replays the symbol table changes it recorded. Translation errors are published right away,
+# gcc -fsyntax-only diagnostics follow from a background thread once gcc is done.
+
+SEVERITY = {"error": 1, "warning": 2, "info": 3}
+GCC_SEVERITY = {"fatal error": 1, "error": 1, "warning": 2, "note": 3}
+GCC_DIAGNOSTIC = re.compile(r"^(.*?):(\d+):(\d+): (fatal error|error|warning|note): (.*)$")
+IDENTIFIER = re.compile(r"[A-Za-z_]\w*")
+
+# Lines between saved translator states; an edit replays at most this many unchanged lines before it
+CHECKPOINT_LINES = 256
+
+
+class Unit:
+    # The translation of one line, or of a whole struct declaration (its fields are laid out together).
+    # Line numbers are stored relative to the unit's first line so the record survives lines moving.
+    __slots__ = ("texts", "entry", "exit", "entries", "messages", "journal", "names", "seen", "runtime", "structs",
+                 "fields")
+
+    def __init__(self, texts, entry):
+        self.texts = texts
+        self.entry = entry  # translator state before the unit: (inMultilineComment, pending parameters)
+        self.exit = None
+        self.entries = []
+        self.messages = []  # (line offset, column, severity, message, code)
+        self.journal = []
+        self.names = tuple(set(IDENTIFIER.findall("\n".join(texts))))
+        self.seen = visibleDeclarations(self.names)
+        self.runtime = False
+        self.structs = {}
+        self.fields = {}
+
+
+def visibleDeclarations(names):
+    # What the translator could see of these names: their symbols, struct layouts and the fields of their
+    # struct types. A unit is reused only while this stays the same, because its C depends on their types.
+    return tuple((symbol.type, symbol.kind, compiler.structLayouts.get(name),
+                  compiler.structFields.get(re.match(r"\w*", symbol.type).group())) if symbol is not None else None
+                 for name, symbol in zip(names, map(compiler.symbols.lookup, names)))
+
+
+def saveState():
+    # Everything the translator carries from one line to the next, plus a comparable signature of it
+    return (compiler.inMultilineComment, tuple(compiler.pendingParameters), dict(compiler.structLayouts),
+            dict(compiler.structFields), compiler.symbols.snapshot(), stateSignature())
+
+def restoreState(state):
+    comment, pending, layouts, fields, table, _ = state
+    compiler.inMultilineComment = comment
+    compiler.pendingParameters[:] = pending
+    compiler.structLayouts.clear()
+    compiler.structLayouts.update(layouts)
+    compiler.structFields.clear()
+    compiler.structFields.update(fields)
+    compiler.symbols.restore(table)
+
+def stateSignature():
+    # Equal signatures mean equal translator state: every visible name with the declarations it shadows
+    declarations = []
+    for name, symbol in compiler.symbols.symbols.items():
+        chain = []
+        while symbol is not None:
+            chain.append((symbol.type, symbol.kind, symbol.depth))
+            symbol = symbol.shadowed
+        declarations.append((name, tuple(chain)))
+    return (compiler.inMultilineComment, tuple(compiler.pendingParameters), len(compiler.symbols.scopes),
+            frozenset(declarations), frozenset(compiler.structLayouts.items()),
+            frozenset((name, tuple(fields.items())) for name, fields in compiler.structFields.items()))
+
+
+class Document:
+    # An open .cpx file and the per-line translation state it was last checked with
+    def __init__(self, uri, text, version):
+        self.uri = uri
+        self.version = version
+        self.sourceName = os.path.basename(unquote(urlparse(uri).path)) or "untitled.cpx"
+        self.lines = text.split("\n")
+        self.units = [None] * len(self.lines)
+        self.translated = 0  # units retranslated by the last update
+        self.checkpoints = {}  # line -> translator state before it, saved every CHECKPOINT_LINES lines
+        self.retranslate()
+
+    def update(self, changes, version):
+        # Applies LSP content changes and retranslates what they touched.
+        # Character offsets are taken as str indexes, which matches UTF-16 outside the astral planes.
+        old = self.lines
+        self.lines = list(old)
+        for change in changes:
+            if "range" not in change:
+                self.lines = change["text"].split("\n")
+                continue
+            start, end = change["range"]["start"], change["range"]["end"]
+            last = min(end["line"], len(self.lines) - 1)
+            prefix = self.lines[start["line"]][:start["character"]] if start["line"] < len(self.lines) else ""
+            suffix = self.lines[last][end["character"]:] if end["line"] <= last else ""
+            self.lines[start["line"]:last + 1] = (prefix + change["text"] + suffix).split("\n")
+        self.version = version
+
+        # Keep the records of the unchanged lines before and after the edited region
+        limit = min(len(old), len(self.lines))
+        head = 0
+        while head < limit and (old[head] is self.lines[head] or old[head] == self.lines[head]):
+            head += 1
+        tail = 0
+        while tail < limit - head and old[-1 - tail] == self.lines[-1 - tail]:
+            tail += 1
+
+        oldEnd, newEnd = len(old) - tail, len(self.lines) - tail
+        self.units = self.units[:head] + [None] * (newEnd - head) + self.units[oldEnd:]
+
+        # Checkpoints before the edit still hold; the ones after it are candidates for stopping early
+        later = {position + newEnd - oldEnd: state for position, state in self.checkpoints.items()
+                 if position >= oldEnd and position > head}
+        self.checkpoints = {position: state for position, state in self.checkpoints.items() if position <= head}
+        self.retranslate(head, newEnd, later)
+
+    def retranslate(self, head=0, regionEnd=0, later=None):
+        # One pass from the last checkpoint before the edit: reused units replay their journal, stale ones
+        # are translated again. Past the edited region (lines regionEnd onwards), the pass stops at the first
+        # old checkpoint whose state it reproduces, since everything after it would replay unchanged.
+        start = max((position for position in self.checkpoints if position <= head), default=None)
+        if start is None:
+            compiler.inMultilineComment = 0
+            compiler.structLayouts.clear()
+            compiler.structFields.clear()
+            compiler.symbols.clear()
+            compiler.pendingParameters.clear()
+            start = 0
+        else:
+            restoreState(self.checkpoints[start])
+        compiler.boundsChecks = False
+        self.translated = 0
+        later = later or {}
+
+        lines = self.lines
+        units = self.units
+        lastCheckpoint = start
+        i = start
+        while i < len(lines):
+            if i > start and i in later and i >= regionEnd and later[i][-1] == stateSignature():
+                self.checkpoints.update((position, state) for position, state in later.items() if position >= i)
+                return
+            if i - lastCheckpoint >= CHECKPOINT_LINES:
+                self.checkpoints[i] = saveState()
+                lastCheckpoint = i
+
+            length = self.unitLength(i) if "struct" in lines[i] else 1
+            texts = tuple(lines[i:i + length])
+            entry = (compiler.inMultilineComment, tuple(compiler.pendingParameters))
+            unit = units[i]
+
+            if unit is None or unit.texts != texts or unit.entry != entry or unit.seen != visibleDeclarations(unit.names):
+                units[i] = self.translateUnit(i, texts, entry)
+                self.translated += 1
+            else:
+                compiler.symbols.currentLine = i + 1
+                compiler.symbols.replay(unit.journal)
+                if unit.structs:
+                    compiler.structLayouts.update(unit.structs)
+                    compiler.structFields.update(unit.fields)
+                compiler.inMultilineComment, pending = unit.exit
+                if pending or compiler.pendingParameters:
+                    compiler.pendingParameters[:] = pending
+
+            for k in range(i + 1, i + length):
+                units[k] = None
+            i += length
+
+    def unitLength(self, i):
+        # A struct declaration is one unit from its header to the closing brace, every other line is its own
+        if compiler.inMultilineComment != 0 or not compiler.STRUCT_HEADER.match(self.lines[i].rstrip("\r")):
+            return 1
+        for j in range(i + 1, len(self.lines)):
+            if self.lines[j].strip() in ["}", "};"]:
+                return j - i + 1
+        return len(self.lines) - i
+
+    def translateUnit(self, start, texts, entry):
+        unit = Unit(texts, entry)
+        texts = [text.rstrip("\r") for text in texts]
+        compiler.runtimeNeeded = False
+        compiler.symbols.currentLine = start + 1
+        compiler.symbols.journal = unit.journal
+        compiler.diagnostics.clear(self.sourceName)
+        compiler.diagnostics.line = start + 1
+        layouts = set(compiler.structLayouts)
+
+        try:
+            if compiler.inMultilineComment == 0 and compiler.STRUCT_HEADER.match(texts[0]):
+                if texts[-1].strip() not in ["}", "};"]:
+                    compiler.diagnostics.warning("W104", "struct is never closed")
+                entries = compiler.lowerStruct([(start + 1 + k, text) for k, text in enumerate(texts)])
+            else:
+                entries = [(start + 1, "".join(compiler.compileLine(compiler.regexEngine(texts[0]))))]
+        finally:
+            compiler.symbols.journal = None
+
+        unit.entries = [(None if n is None else n - start - 1, text) for n, text in entries]
+        unit.exit = (compiler.inMultilineComment, tuple(compiler.pendingParameters))
+        unit.runtime = compiler.runtimeNeeded
+        unit.structs = {name: compiler.structLayouts[name] for name in set(compiler.structLayouts) - layouts}
+        unit.fields = {name: compiler.structFields[name] for name in unit.structs if name in compiler.structFields}
+
+        # Stored relative to the unit so they stay right when lines above it are added or removed
+        for record in compiler.diagnostics.records:
+            offset = 0 if record.line is None else record.line - start - 1
+            unit.messages.append((offset, (record.column or 1) - 1, SEVERITY[record.severity], record.message, record.code))
+        compiler.diagnostics.clear()
+        return unit
+
+    def diagnostics(self):
+        # Translation errors and warnings as LSP diagnostics
+        result = []
+        for i, unit in enumerate(self.units):
+            if unit is not None:
+                for offset, column, severity, message, code in unit.messages:
+                    result.append(diagnostic(self.lines, i + offset, column, severity, message, "cpx", code))
+        return result
+
+    def cSource(self):
+        return cSource(self.units, self.sourceName)
+
+
+def cSource(units, sourceName):
+    # The whole translated file, with #line markers naming the .cpx file on every line
+    entries = []
+    runtime = False
+    for i, unit in enumerate(units):
+        if unit is not None:
+            runtime = runtime or unit.runtime
+            entries.extend((None if offset is None else i + offset + 1, text) for offset, text in unit.entries)
+    if runtime:
+        entries.insert(0, (None, '#include "cplus.h"\n'))
+    output, _ = compiler.emitLines(entries, sourceName, True)
+    return "".join(output)
+
+def diagnostic(lines, line, column, severity, message, source, code=None):
+    length = len(lines[line]) if 0 <= line < len(lines) else 0
+    result = {
+        "range": {"start": {"line": line, "character": column}, "end": {"line": line, "character": max(length, column)}},
+        "severity": severity,
+        "source": source,
+        "message": message,
+    }
+    if code is not None:
+        result["code"] = code
+    return result
+
+def gccDiagnostics(cSource, sourceName, lines):
+    # Runs gcc -fsyntax-only on the translated C; the #line markers put its messages on .cpx lines
+    try:
+        process = subprocess.run(["gcc", "-fsyntax-only", "-fdiagnostics-color=never", "-x", "c", "-"]
+                                 + compiler.gccFlags([]), input=cSource, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.TimeoutExpired) as e:
+        return [diagnostic(lines, 0, 0, 2, f"Could not run gcc: {e}", "gcc")]
+
+    result = []
+    for message in process.stderr.splitlines():
+        match = GCC_DIAGNOSTIC.match(message)
+        # Messages inside headers (or the generated include line) have no .cpx line to go on
+        if match is None or os.path.basename(match.group(1)) != sourceName:
+            continue
+        _, line, _, kind, text = match.groups()
+        # gcc's column is into the generated C, so the whole .cpx line is marked
+        result.append(diagnostic(lines, int(line) - 1, 0, GCC_SEVERITY[kind], text, "gcc"))
+    return result
+
+
+class Server:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.documents = {}
+        self.writeLock = threading.Lock()
+        self.shutdown = False
+
+        # gcc runs on a worker thread; only the newest version of each document is checked
+        self.checks = {}
+        self.checkReady = threading.Condition()
+        threading.Thread(target=self.checkLoop, daemon=True).start()
+
+    def readMessage(self):
+        length = None
+        while True:
+            header = self.reader.readline()
+            if not header:
+                return None
+            header = header.decode("ascii").strip()
+            if header == "":
+                break
+            name, _, value = header.partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        if length is None:
+            return None
+        return json.loads(self.reader.read(length).decode("utf-8"))
+
+    def send(self, message):
+        body = json.dumps(message).encode("utf-8")
+        with self.writeLock:
+            self.writer.write(f"Content-Length: {len(body)}\r\n\r\n".encode("ascii") + body)
+            self.writer.flush()
+
+    def publish(self, document, diagnostics):
+        self.send({"jsonrpc": "2.0", "method": "textDocument/publishDiagnostics",
+                   "params": {"uri": document.uri, "version": document.version, "diagnostics": diagnostics}})
+
+    def check(self, document):
+        # Publishes the translation diagnostics now and queues the gcc check
+        translation = document.diagnostics()
+        self.publish(document, translation)
+        with self.checkReady:
+            # Units are never modified once built, so the worker can assemble the C from copies of the lists
+            self.checks[document.uri] = (document, document.version, list(document.units), list(document.lines), translation)
+            self.checkReady.notify()
+
+    def checkLoop(self):
+        while True:
+            with self.checkReady:
+                while not self.checks:
+                    self.checkReady.wait()
+                uri = next(iter(self.checks))
+                document, version, units, lines, translation = self.checks.pop(uri)
+
+            diagnostics = gccDiagnostics(cSource(units, document.sourceName), document.sourceName, lines)
+            # A newer edit has its own check queued, don't publish stale results over it
+            if self.documents.get(uri) is document and document.version == version:
+                self.publish(document, translation + diagnostics)
+
+    def handle(self, message):
+        method = message.get("method")
+        params = message.get("params") or {}
+
+        if method == "initialize":
+            return {"capabilities": {"textDocumentSync": {"openClose": True, "change": 2}},
+                    "serverInfo": {"name": "cplus-lsp"}}
+        if method == "shutdown":
+            self.shutdown = True
+            return None
+        if method == "exit":
+            sys.exit(0 if self.shutdown else 1)
+
+        if method == "textDocument/didOpen":
+            item = params["textDocument"]
+            document = Document(item["uri"], item["text"], item.get("version"))
+            self.documents[item["uri"]] = document
+            self.check(document)
+        elif method == "textDocument/didChange":
+            document = self.documents.get(params["textDocument"]["uri"])
+            if document is not None:
+                document.update(params["contentChanges"], params["textDocument"].get("version"))
+                self.check(document)
+        elif method == "textDocument/didClose":
+            document = self.documents.pop(params["textDocument"]["uri"], None)
+            if document is not None:
+                self.publish(document, [])
+        elif "id" in message and method not in ["initialized"]:
+            raise LookupError(method)
+        return None
+
+    def serve(self):
+        while True:
+            message = self.readMessage()
+            if message is None:
+                return
+            try:
+                result = self.handle(message)
+                if "id" in message and "method" in message:
+                    self.send({"jsonrpc": "2.0", "id": message["id"], "result": result})
+            except LookupError as e:
+                self.send({"jsonrpc": "2.0", "id": message["id"],
+                           "error": {"code": -32601, "message": f"Method not found: {e}"}})
+            except Exception as e:
+                if "id" in message:
+                    self.send({"jsonrpc": "2.0", "id": message["id"], "error": {"code": -32603, "message": str(e)}})
+
+
+def main():
+    Server(sys.stdin.buffer, sys.stdout.buffer).serve()
+
+
+if __name__ == "__main__":
+    main()
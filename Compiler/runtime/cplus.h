@@ -0,0 +1,160 @@
+/*
+ * C+ runtime: length-carrying strings.
+ *
+ * The compiler lowers `let x: string` to cp_string and includes this header
+ * automatically. The length is stored next to the data, so reading it is O(1),
+ * appends grow the buffer geometrically (amortised O(1) per byte), and slices
+ * are views into the original storage without copying.
+ *
+ * A cp_string with cap == 0 borrows its storage (a literal or a char * it was
+ * built from) and is copied into its own heap buffer on the first append.
+ * Owned buffers are always kept NUL terminated so data can be passed to C:
+ * the compiler passes a string variable given straight to a C function as
+ * its data, and cp_str_cstr(s) does the same inside larger expressions.
+ *
+ * Checked builds (cpx --checked) also route array indexing through
+ * cp_bounds_check; release builds index arrays directly.
+ */
+#ifndef CPLUS_RUNTIME_H
+#define CPLUS_RUNTIME_H
+
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+typedef struct {
+    char *data;
+    size_t len;
+    size_t cap;
+} cp_string;
+
+typedef struct {
+    const char *data;
+    size_t len;
+} cp_str_view;
+
+#define CP_STR_INIT {(char *)"", 0, 0}
+
+/* Literal lengths come from sizeof, no strlen at runtime */
+#define cp_str_lit(s) ((cp_string){(char *)(s), sizeof(s) - 1, 0})
+#define cp_str_len(s) ((s).len)
+#define cp_str_cstr(s) ((const char *)(s).data)
+
+static inline cp_string cp_str_from(const char *cstr) {
+    cp_string s = {(char *)cstr, strlen(cstr), 0};
+    return s;
+}
+
+static inline void cp_str_reserve(cp_string *s, size_t need) {
+    if (s->cap > need) {
+        return;
+    }
+
+    size_t cap = s->cap ? s->cap : 16;
+    while (cap <= need) {
+        cap *= 2;
+    }
+
+    char *data;
+    if (s->cap == 0) {
+        /* Borrowed storage: copy it into a buffer we own */
+        data = malloc(cap);
+        if (data != NULL) {
+            memcpy(data, s->data, s->len);
+        }
+    } else {
+        data = realloc(s->data, cap);
+    }
+
+    if (data == NULL) {
+        fprintf(stderr, "[C+ runtime] out of memory growing a string to %zu bytes\n", cap);
+        abort();
+    }
+
+    data[s->len] = '\0';
+    s->data = data;
+    s->cap = cap;
+}
+
+static inline void cp_str_append_buf(cp_string *s, const char *data, size_t len) {
+    /* Appending (part of) the string to itself: growing may move the buffer, so keep an offset */
+    uintptr_t start = (uintptr_t)s->data, at = (uintptr_t)data;
+    int inside = at >= start && at <= start + s->len;
+    size_t offset = inside ? (size_t)(at - start) : 0;
+
+    cp_str_reserve(s, s->len + len);
+    if (inside) {
+        data = s->data + offset;
+    }
+    memmove(s->data + s->len, data, len);
+    s->len += len;
+    s->data[s->len] = '\0';
+}
+
+static inline void cp_str_append(cp_string *s, cp_string other) {
+    cp_str_append_buf(s, other.data, other.len);
+}
+
+static inline void cp_str_append_view(cp_string *s, cp_str_view view) {
+    cp_str_append_buf(s, view.data, view.len);
+}
+
+static inline void cp_str_append_cstr(cp_string *s, const char *cstr) {
+    cp_str_append_buf(s, cstr, strlen(cstr));
+}
+
+static inline void cp_str_append_char(cp_string *s, char c) {
+    cp_str_append_buf(s, &c, 1);
+}
+
+static inline cp_string cp_str_copy(cp_string s) {
+    cp_string copy = CP_STR_INIT;
+    cp_str_append_buf(&copy, s.data, s.len);
+    return copy;
+}
+
+/* View of [start, end), clamped to the string */
+static inline cp_str_view cp_str_slice(cp_string s, size_t start, size_t end) {
+    if (end > s.len) {
+        end = s.len;
+    }
+    if (start > end) {
+        start = end;
+    }
+    cp_str_view view = {s.data + start, end - start};
+    return view;
+}
+
+static inline int cp_str_eq(cp_string a, cp_string b) {
+    return a.len == b.len && memcmp(a.data, b.data, a.len) == 0;
+}
+
+static inline void cp_str_clear(cp_string *s) {
+    s->len = 0;
+    if (s->cap) {
+        s->data[0] = '\0';
+    } else {
+        s->data = (char *)"";
+    }
+}
+
+static inline void cp_str_free(cp_string *s) {
+    if (s->cap) {
+        free(s->data);
+    }
+    s->data = (char *)"";
+    s->len = 0;
+    s->cap = 0;
+}
+
+/* Aborts with the .cpx location (via #line) when an index is out of range */
+static inline size_t cp_bounds_check(long long index, size_t size, const char *name, const char *file, int line) {
+    if (index < 0 || (size_t)index >= size) {
+        fprintf(stderr, "%s:%d: index %lld out of bounds for %s[%zu]\n", file, line, index, name, size);
+        abort();
+    }
+    return (size_t)index;
+}
+
+#endif
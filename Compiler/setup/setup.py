@@ -195,17 +195,32 @@ def installGcc():
     return False
 
 
+STDLIB_MODULES = ["re", "sys", "os", "subprocess", "platform", "tempfile"]
+
+
+def probeDependencies():
+    """Run every dependency probe at once, returns {name: found}"""
+    from concurrent.futures import ThreadPoolExecutor
+
+    probes = {mod: (checkPythonPackage, mod) for mod in STDLIB_MODULES}
+    probes["Pillow"] = (checkPythonPackage, "Pillow", "PIL")
+    probes["gcc"] = (checkGcc,)
+    with ThreadPoolExecutor(max_workers=len(probes)) as pool:
+        futures = {name: pool.submit(*probe) for name, probe in probes.items()}
+    return {name: future.result() for name, future in futures.items()}
+
+
 def checkDependencies():
     """Check and install all required dependencies"""
     print("\n=== CHECKING DEPENDENCIES ===")
     
     allSatisfied = True
+    found = probeDependencies()
     
     # Check standard library modules (these should always be available)
-    stdlibModules = ["re", "sys", "os", "subprocess", "platform", "tempfile"]
     print("[*] Checking Python standard library modules...")
-    for mod in stdlibModules:
-        if checkPythonPackage(mod):
+    for mod in STDLIB_MODULES:
+        if found[mod]:
             print(f"    [+] {mod}")
         else:
             print(f"    [!] {mod} missing (this is unusual)")
@@ -213,7 +228,7 @@ def checkDependencies():
     
     # Check Pillow
     print("\n[*] Checking third-party packages...")
-    if not checkPythonPackage("Pillow", "PIL"):
+    if not found["Pillow"]:
         print("    [!] Pillow not installed")
         if installPythonPackage("Pillow"):
             allSatisfied = allSatisfied and True
@@ -225,7 +240,7 @@ def checkDependencies():
     
     # Check GCC
     print("\n[*] Checking command-line tools...")
-    if checkGcc():
+    if found["gcc"]:
         print("    [+] GCC compiler")
     else:
         print("    [!] GCC compiler not found")
@@ -250,6 +265,33 @@ def checkDependencies():
 
 
 # ================ ICON GENERATION ================
+def fileHash(*parts):
+    """SHA-256 of files and strings, for telling whether generated files are current"""
+    import hashlib
+    digest = hashlib.sha256()
+    for part in parts:
+        if os.path.isfile(part):
+            with open(part, "rb") as f:
+                digest.update(f.read())
+        else:
+            digest.update(part.encode())
+    return digest.hexdigest()
+
+
+def isCurrent(outPath, digest):
+    """True if outPath was generated from inputs with this hash"""
+    stampPath = outPath + ".hash"
+    if not os.path.exists(outPath) or not os.path.exists(stampPath):
+        return False
+    with open(stampPath, "r") as f:
+        return f.read() == digest
+
+
+def markCurrent(outPath, digest):
+    with open(outPath + ".hash", "w") as f:
+        f.write(digest)
+
+
 def loadImage(path):
     from PIL import Image
     img = Image.open(path)
@@ -258,34 +300,63 @@ def loadImage(path):
     return img
 
 
-def makeWindowsIco(img, outPath):
-    img.save(outPath, format="ICO", sizes=[(s, s) for s in WINDOWS_SIZES])
+def scaleFrom(parent, img, size):
+    """The image at size x size, resized from the parent's result (or the source for the largest size)"""
+    from PIL import Image
+    source = img if parent is None else parent.result()
+    if source.size == (size, size):
+        return source
+    return source.resize((size, size), Image.LANCZOS)
+
+
+def scaledImages(img, sizes, pool):
+    """{size: future image}, largest first, each size derived from the next larger one instead of the full source"""
+    futures = {}
+    parent = None
+    for size in sorted(set(sizes), reverse=True):
+        # Every task only waits on tasks submitted before it, so the pool can't deadlock
+        parent = pool.submit(scaleFrom, parent, img, size)
+        futures[size] = parent
+    return futures
+
+
+def saveScaled(future, path):
+    future.result().save(path)
+
+
+def makeWindowsIco(img, outPath, pool):
+    images = scaledImages(img, WINDOWS_SIZES, pool)
+    largest = max(WINDOWS_SIZES)
+    img = images[largest].result()
+    # The ICO encoder uses the provided image of each size rather than scaling the first one
+    img.save(outPath, format="ICO", sizes=[(s, s) for s in WINDOWS_SIZES],
+             append_images=[images[s].result() for s in WINDOWS_SIZES if s != largest])
     print(f"[+] Windows ICO: {outPath}")
 
 
-def makeLinuxIcons(img, outDir):
-    from PIL import Image
+def makeLinuxIcons(img, outDir, pool):
     os.makedirs(outDir, exist_ok=True)
-    for size in LINUX_SIZES:
-        resized = img.resize((size, size), Image.LANCZOS)
-        resized.save(os.path.join(outDir, f"{size}x{size}.png"))
+    images = scaledImages(img, LINUX_SIZES, pool)
+    saves = [pool.submit(saveScaled, images[size], os.path.join(outDir, f"{size}x{size}.png")) for size in LINUX_SIZES]
+    for save in saves:
+        save.result()
     print(f"[+] Linux icons: {outDir}/")
 
 
-def makeMacosIcns(img, outPath):
+def makeMacosIcns(img, outPath, pool):
     """macOS .icns creation using iconutil"""
-    from PIL import Image
     with tempfile.TemporaryDirectory() as tmp:
         iconset = os.path.join(tmp, "icon.iconset")
         os.makedirs(iconset)
 
+        images = scaledImages(img, MAC_SIZES + [size * 2 for size in MAC_SIZES if size <= 512], pool)
+        saves = []
         for size in MAC_SIZES:
-            normal = img.resize((size, size), Image.LANCZOS)
-            normal.save(os.path.join(iconset, f"icon_{size}x{size}.png"))
-
+            saves.append(pool.submit(saveScaled, images[size], os.path.join(iconset, f"icon_{size}x{size}.png")))
             if size <= 512:
-                retina = img.resize((size * 2, size * 2), Image.LANCZOS)
-                retina.save(os.path.join(iconset, f"icon_{size}x{size}@2x.png"))
+                saves.append(pool.submit(saveScaled, images[size * 2], os.path.join(iconset, f"icon_{size}x{size}@2x.png")))
+        for save in saves:
+            save.result()
 
         subprocess.run(
             ["iconutil", "-c", "icns", iconset, "-o", outPath],
@@ -296,41 +367,103 @@ def makeMacosIcns(img, outPath):
 
 
 def generateIcons(sourceImage):
-    """Generate icons for the current OS only"""
+    """Generate icons for the current OS only, unless they were already generated from this image"""
+    from concurrent.futures import ThreadPoolExecutor
+
     base = "cpx"
-    img = loadImage(sourceImage)
     osName = platform.system()
 
     if osName == "Windows":
-        makeWindowsIco(img, os.path.join(SETUP_DIR, f"{base}.ico"))
+        maker, outPath, sizes = makeWindowsIco, os.path.join(SETUP_DIR, f"{base}.ico"), WINDOWS_SIZES
     elif osName == "Linux":
-        makeLinuxIcons(img, os.path.join(SETUP_DIR, f"{base}_linux_icons"))
+        maker, outPath, sizes = makeLinuxIcons, os.path.join(SETUP_DIR, f"{base}_linux_icons"), LINUX_SIZES
     elif osName == "Darwin":
-        makeMacosIcns(img, os.path.join(SETUP_DIR, f"{base}.icns"))
+        maker, outPath, sizes = makeMacosIcns, os.path.join(SETUP_DIR, f"{base}.icns"), MAC_SIZES
+    else:
+        return
+
+    digest = fileHash(sourceImage, repr(sizes))
+    if isCurrent(outPath, digest):
+        print(f"[*] Icons are up to date: {outPath}")
+        return
+
+    # Pillow releases the GIL while resizing and encoding, so threads run them in parallel
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as pool:
+        maker(loadImage(sourceImage), outPath, pool)
+    markCurrent(outPath, digest)
 
 
 # ================ LAUNCHER CREATION ================
+BUNDLE_MODULES = ["compiler", "lsp", "buildfarm"]
+
+
+def createBundle(bundlePath=None):
+    """Build cpx.pyz, a zipapp of the compiler modules with precompiled bytecode"""
+    import py_compile
+    import zipfile
+
+    if bundlePath is None:
+        bundlePath = os.path.join(SCRIPT_DIR, "cpx.pyz")
+
+    # The archive comment holds the hash of what it was built from
+    sources = [os.path.join(SCRIPT_DIR, f"{name}.py") for name in BUNDLE_MODULES]
+    digest = fileHash(*sources, sys.version)
+    if os.path.exists(bundlePath):
+        try:
+            with zipfile.ZipFile(bundlePath) as bundle:
+                if bundle.comment.decode() == digest:
+                    print(f"[*] Bundle is up to date: {bundlePath}")
+                    return bundlePath
+        except (zipfile.BadZipFile, UnicodeDecodeError):
+            pass
+
+    temporary = bundlePath + ".tmp"
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(temporary, "wb") as f:
+            f.write(b"#!/usr/bin/env python3\n")
+            # Stored, not deflated: nothing to decompress at startup
+            with zipfile.ZipFile(f, "w", zipfile.ZIP_STORED) as bundle:
+                bundle.comment = digest.encode()
+                bundle.writestr("__main__.py", "import compiler\ncompiler.main()\n")
+                for name, source in zip(BUNDLE_MODULES, sources):
+                    compiled = os.path.join(tmp, f"{name}.pyc")
+                    # Unchecked-hash bytecode is loaded without comparing it against the source. The source
+                    # is still bundled for tracebacks, and for a different Python version that can't use the bytecode.
+                    py_compile.compile(source, cfile=compiled, doraise=True,
+                                       invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH)
+                    bundle.write(source, f"{name}.py")
+                    bundle.write(compiled, f"{name}.pyc")
+    os.replace(temporary, bundlePath)
+    print(f"[+] Created bundle: {bundlePath}")
+    return bundlePath
+
+
+def writeLauncher(path, content):
+    """Write a launcher unless it already has this content"""
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            if f.read() == content:
+                print(f"[*] {os.path.basename(path)} is up to date, skipping creation.")
+                return
+    with open(path, "w") as f:
+        f.write(content)
+    print(f"[+] Created launcher: {path}")
+
+
 def createLauncher():
     """Create platform-specific launcher"""
-    compilerScript = os.path.join(SCRIPT_DIR, "compiler.py")
+    try:
+        target = createBundle()
+    except Exception as e:
+        print(f"[!] Bundle creation failed, the launcher will run compiler.py: {e}")
+        target = os.path.join(SCRIPT_DIR, "compiler.py")
     
     if platform.system() == "Windows":
-        batPath = os.path.join(SCRIPT_DIR, "cpx.bat")
-        if os.path.exists(batPath):
-            print("[*] cpx.bat already exists, skipping creation.")
-        else:
-            with open(batPath, "w") as f:
-                f.write(f'@echo off\npython "{compilerScript}" %*\n')
-            print(f"[+] Created launcher: {batPath}")
+        writeLauncher(os.path.join(SCRIPT_DIR, "cpx.bat"), f'@echo off\npython "{target}" %*\n')
     else:
         shPath = os.path.join(SCRIPT_DIR, "cpx")
-        if os.path.exists(shPath):
-            print("[*] cpx launcher already exists, skipping creation.")
-        else:
-            with open(shPath, "w") as f:
-                f.write(f'#!/bin/bash\npython3 "{compilerScript}" "$@"\n')
-            os.chmod(shPath, 0o755)
-            print(f"[+] Created launcher: {shPath}")
+        writeLauncher(shPath, f'#!/bin/bash\npython3 "{target}" "$@"\n')
+        os.chmod(shPath, 0o755)
 
 
 # ================ PATH MANAGEMENT ================
@@ -480,6 +613,9 @@ def registerMacos():
 
 def registerLinux():
     """Register .cpx file type on Linux"""
+    import filecmp
+    import shutil
+
     iconDir = os.path.join(SETUP_DIR, "cpx_linux_icons")
     if not os.path.isdir(iconDir):
         raise FileNotFoundError("cpx_linux_icons directory not found - run icon generation first")
@@ -500,23 +636,31 @@ def registerLinux():
 </mime-info>
 """
 
+    # The MIME database and icon cache are only rebuilt when something changed
     mimeFile = os.path.join(mimeDir, "cpx.xml")
-    with open(mimeFile, "w") as f:
-        f.write(mimeXml)
-
-    subprocess.run(["update-mime-database", os.path.expanduser("~/.local/share/mime")])
-
+    current = None
+    if os.path.exists(mimeFile):
+        with open(mimeFile, "r") as f:
+            current = f.read()
+    if current != mimeXml:
+        with open(mimeFile, "w") as f:
+            f.write(mimeXml)
+        subprocess.run(["update-mime-database", os.path.expanduser("~/.local/share/mime")])
+
+    copied = False
     for file in os.listdir(iconDir):
         size = file.replace(".png", "")
         target = os.path.join(iconTarget, size, "mimetypes")
+        source = os.path.join(iconDir, file)
+        targetFile = os.path.join(target, "text-x-cpx.png")
+        if os.path.exists(targetFile) and filecmp.cmp(source, targetFile, shallow=False):
+            continue
         os.makedirs(target, exist_ok=True)
-        subprocess.run([
-            "cp",
-            os.path.join(iconDir, file),
-            os.path.join(target, "text-x-cpx.png")
-        ])
+        shutil.copyfile(source, targetFile)
+        copied = True
 
-    subprocess.run(["gtk-update-icon-cache", iconTarget], stderr=subprocess.DEVNULL)
+    if copied:
+        subprocess.run(["gtk-update-icon-cache", iconTarget], stderr=subprocess.DEVNULL)
 
     print("[+] Linux MIME + icon registered for .cpx")
 
@@ -0,0 +1,21 @@
+#include <stdio.h>
+
+int main() {
+    _Alignas(32) int values[8] = {1, 2, 3};
+    char small[3];
+    static int table[4];
+    int total = 0;
+
+    for (int i = 0; i < 8; i++) {
+        values[i] = values[i] * 2 + i;
+    }
+    for (int i = 0; i < 8; i++) {
+        total = total + values[i];
+    }
+    table[3] = total;
+    small[0] = 'a';
+    printf("%d\n", total);
+    printf("%d\n", table[3]);
+    printf("%c\n", small[0]);
+    return 0;
+}
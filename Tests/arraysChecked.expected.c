@@ -0,0 +1,24 @@
+#include "cplus.h"
+#line 1 "arraysChecked.cpx"
+
+#include <stdio.h>
+
+int main() {
+    _Alignas(32) int values[8] = {1, 2, 3};
+    char small[3];
+    static int table[4];
+    int total = 0;
+
+    for (int i = 0; i < 8; i++) {
+        values[cp_bounds_check(i, 8, "values", __FILE__, __LINE__)] = values[cp_bounds_check(i, 8, "values", __FILE__, __LINE__)] * 2 + i;
+    }
+    for (int i = 0; i < 8; i++) {
+        total = total + values[cp_bounds_check(i, 8, "values", __FILE__, __LINE__)];
+    }
+    table[3] = total;
+    small[0] = 'a';
+    printf("%d\n", total);
+    printf("%d\n", table[3]);
+    printf("%c\n", small[0]);
+    return 0;
+}
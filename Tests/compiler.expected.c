@@ -0,0 +1,247 @@
+#include "cplus.h"
+#line 1 "compiler.cpx"
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+
+int *inMultilineComment = NULL;
+
+int is_windows() {
+    #ifdef _WIN32
+        return 1;
+    #else
+        return 0;
+    #endif
+}
+
+int compileC(cp_string filename, int has_c_flag, int has_r_flag, int has_d_flag) {
+    _Alignas(32) char output_name[4096];
+    _Alignas(32) char cmd[8192];
+    _Alignas(32) char fileexe[4096];
+
+    if (has_c_flag == 0) {
+        if (is_windows()) {
+            sprintf(output_name, "%.*s.exe", (int)filename.len - 2, filename.data);
+        } else {
+            sprintf(output_name, "%.*s", (int)filename.len - 2, filename.data);
+        }
+
+        sprintf(cmd, "gcc %s -o %s", filename.data, output_name);
+
+        if (system(cmd) != 0) {
+            printf("[Error] GCC compilation failed\n");
+            return 1;
+        }
+
+        remove(filename.data);
+
+        if (has_r_flag) {
+            if (is_windows()) {
+                sprintf(fileexe, "%.*s.exe", (int)filename.len - 2, filename.data);
+            } else {
+                sprintf(fileexe, "./%.*s", (int)filename.len - 2, filename.data);
+            }
+
+            if (system(fileexe) != 0) {
+                printf("[Error] Program execution failed\n");
+            }
+
+            if (has_d_flag) {
+                remove(output_name);
+            }
+        }
+    }
+
+    return 0;
+}
+
+int writeFile(char *line, char *filepath) {
+    FILE *file = fopen(filepath, "a");
+
+    if (file == NULL) {
+        printf("[Error] Could not open file '%s'\n", filepath);
+        return 1;
+    }
+
+    fprintf(file, "%s", line);
+    fclose(file);
+
+    return 0;
+}
+
+int countLines(cp_string filepath) {
+    FILE *file = fopen(filepath.data, "r");
+    int count = 0;
+    int ch;
+
+    if (file == NULL) {
+        printf("[Error] File not found: '%s'\n", filepath.data);
+        return -1;
+    }
+
+    while ((ch = fgetc(file)) != EOF) {
+        if (ch == '\n') {
+            count = count + 1;
+        }
+    }
+
+    fclose(file);
+    return count;
+}
+
+int getLine(cp_string filename, int n, char *buffer) {
+    FILE *file = fopen(filename.data, "r");
+    int current_line = 0;
+
+    if (file == NULL) {
+        printf("[Error] File not found: '%s'\n", filename.data);
+        return 1;
+    }
+
+    while (fgets(buffer, 4096, file) != NULL) {
+        current_line = current_line + 1;
+        if (current_line == n) {
+            fclose(file);
+            return 0;
+        }
+    }
+
+    fclose(file);
+    return 1;
+}
+
+int removeNewline(char *str) {
+    int len = strlen(str);
+    int i;
+
+    for (i = 0; i < len; i = i + 1) {
+        if (str[i] == '\n' || str[i] == '\r') {
+            str[i] = '\0';
+            return 0;
+        }
+    }
+
+    return 0;
+}
+
+int compileLine(char *line, char *output) {
+    _Alignas(32) char temp[4096];
+
+    if (strlen(line) == 0 || line[0] == '\n') {
+        strcpy(output, "\n");
+        return 0;
+    }
+
+    strcpy(temp, line);
+
+    if (strstr(temp, "let ") != NULL) {
+        char *ptr = strstr(temp, "let ");
+        char *colon = strchr(ptr, ':');
+
+        if (colon != NULL) {
+            if (strstr(colon, "int") != NULL) {
+                memcpy(ptr, "int", 3);
+            } else if (strstr(colon, "float") != NULL) {
+                memcpy(ptr, "float", 5);
+            } else if (strstr(colon, "double") != NULL) {
+                memcpy(ptr, "double", 6);
+            } else if (strstr(colon, "string") != NULL) {
+                memcpy(ptr, "char*", 5);
+            }
+        }
+    }
+
+    if (strstr(temp, "fn ") != NULL) {
+        char *ptr = strstr(temp, "fn ");
+
+        if (strstr(temp, "->") != NULL) {
+            memcpy(ptr, "int", 3);
+        } else {
+            memcpy(ptr, "void", 4);
+        }
+    }
+
+    if (strstr(temp, "print(") != NULL) {
+        char *ptr = strstr(temp, "print");
+        memcpy(ptr, "printf", 6);
+    }
+
+    if (strstr(temp, "import ") != NULL) {
+        char *ptr = strstr(temp, "import ");
+        memcpy(ptr, "#include <", 10);
+    }
+
+    strcpy(output, temp);
+
+    int len = strlen(output);
+    if (len > 0 && output[len - 1] != ';' && output[len - 1] != '{' && output[len - 1] != '}') {
+        strcat(output, ";");
+    }
+
+    strcat(output, "\n");
+
+    return 0;
+}
+
+int main(int argc, char **argv) {
+    cp_string filename = CP_STR_INIT;
+    _Alignas(32) char cfilepath[4096];
+    int numLines;
+    int i;
+    _Alignas(32) char line[4096];
+    _Alignas(32) char compiled[4096];
+    int has_c_flag = 0;
+    int has_r_flag = 0;
+    int has_d_flag = 0;
+
+    if (argc < 2) {
+        printf("[Error] Usage: cpc <filename.cpx> [options]\n");
+        return 1;
+    }
+
+    for (i = 1; i < argc; i = i + 1) {
+        if (strcmp(argv[i], "-v") == 0) {
+            printf("C+ Compiler Version:\n v0.2.3\n");
+            return 0;
+        }
+        if (strcmp(argv[i], "-c") == 0) {
+            has_c_flag = 1;
+        }
+        if (strcmp(argv[i], "-r") == 0) {
+            has_r_flag = 1;
+        }
+        if (strcmp(argv[i], "-d") == 0) {
+            has_d_flag = 1;
+        }
+    }
+
+    filename = cp_str_from(argv[1]);
+
+    if (strstr(filename.data, ".cpx") == NULL) {
+        printf("[Error] A .cpx file is required\n");
+        return 1;
+    }
+
+    sprintf(cfilepath, "%.*sc", (int)filename.len - 3, filename.data);
+
+    remove(cfilepath);
+
+    numLines = countLines(filename);
+
+    if (numLines == -1) {
+        printf("[Error] Failed to read input file\n");
+        return 1;
+    }
+
+    for (i = 1; i <= numLines; i = i + 1) {
+        if (getLine(filename, i, line) == 0) {
+            removeNewline(line);
+            compileLine(line, compiled);
+            writeFile(compiled, cfilepath);
+        }
+    }
+
+    compileC(cp_str_from(cfilepath), has_c_flag, has_r_flag, has_d_flag);
+
+    return 0;
+}
@@ -0,0 +1,84 @@
+import os
+import sys
+import tempfile
+import threading
+
+# Checks that build workers refuse gcc flags that load code or write files of their own, and that gcc runs in a
+# scratch directory rather than the worker's working directory.
+# Usage: python farmFlags.py
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "Compiler"))
+
+import buildfarm
+
+REJECTED = [
+    "-fdump-tree-original=.bashrc",
+    "-fdump-tree-original",
+    "-fdump-rtl-all",
+    "-fstack-usage",
+    "-fcallgraph-info",
+    "-fprofile-generate",
+    "-fprofile-use=/tmp/profile",
+    "-fprofile-arcs",
+    "-fauto-profile",
+    "-fauto-profile=perf.afdo",
+    "-fplugin=./evil.so",
+    "-fopt-info-vec=report.txt",
+    "-ftest-coverage",
+    "-fsave-optimization-record",
+    "-fvisibility=../hidden",
+    "-fmax-errors=/etc/passwd",
+    "-Wl,-rpath,/tmp",
+    "-Wa,-adhln=listing.s",
+    "-o",
+    "-B/tmp",
+    "-specs=evil.specs",
+]
+
+ACCEPTED = [
+    "-O2", "-O3", "-Os", "-Ofast", "-g", "-g2", "-march=native", "-mavx2", "-march=armv8.2-a",
+    "-fopenmp", "-fno-strict-aliasing", "-fvisibility=hidden", "-fsanitize=address,undefined",
+    "-fmax-errors=5", "-ffp-contract=fast", "-Wall", "-Wextra", "-Werror=format", "-w", "-std=c11",
+    "-pedantic",
+]
+
+SOURCE = b"int unit(int n) { return n * 2; }\n"
+
+
+def main():
+    failures = []
+    for flag in REJECTED:
+        if buildfarm.allowedFlag(flag):
+            failures.append(f"accepted {flag}")
+        header, _ = buildfarm.compileObject([flag], SOURCE, threading.Lock())
+        if header.get("ok") or "not allowed" not in header.get("stderr", ""):
+            failures.append(f"worker compiled with {flag}")
+
+    for flag in ACCEPTED:
+        if not buildfarm.allowedFlag(flag):
+            failures.append(f"rejected {flag}")
+
+    # Nothing gcc writes may land in the worker's own directory
+    with tempfile.TemporaryDirectory() as directory:
+        previous = os.getcwd()
+        os.chdir(directory)
+        try:
+            header, objectFile = buildfarm.compileObject(["-O2", "-g"], SOURCE, threading.Lock())
+            left = os.listdir(directory)
+        finally:
+            os.chdir(previous)
+        if not header.get("ok") or not objectFile:
+            failures.append(f"plain compile failed: {header.get('stderr', '')}")
+        if left:
+            failures.append(f"gcc wrote into the worker's directory: {', '.join(left)}")
+
+    for failure in failures:
+        print(f"[Error] {failure}")
+    print(f"[Info] {len(REJECTED)} rejected and {len(ACCEPTED)} accepted flags checked, {len(failures)} failures")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
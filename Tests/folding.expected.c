@@ -0,0 +1,33 @@
+#include <stdio.h>
+
+int main() {
+
+    int seconds = 86400;
+    int truncated = -3;
+    int remainder = -1;
+    int shifted = 16;
+    int grouped = 15;
+
+
+#line 14 "folding.cpx"
+    {
+        printf("always\n");
+    }
+    {
+        printf("taken\n");
+    }
+
+
+    #ifdef _WIN32
+        printf("windows\n");
+    #else
+        printf("not windows\n");
+    #endif
+
+    printf("%d\n", seconds);
+    printf("%d\n", truncated);
+    printf("%d\n", remainder);
+    printf("%d\n", shifted);
+    printf("%d\n", grouped);
+    return 0;
+}
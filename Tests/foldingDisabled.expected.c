@@ -0,0 +1,35 @@
+
+#include <stdio.h>
+
+int main() {
+
+    int seconds = 60 * 60 * 24;
+    int truncated = -7 / 2;
+    int remainder = -7 % 2;
+    int shifted = 1 << 4;
+    int grouped = (2 + 3) * (4 - 1);
+
+
+    if (0) {
+        printf("never\n");
+    } else {
+        printf("always\n");
+    }
+    if (1 + 1 == 2) {
+        printf("taken\n");
+    }
+
+
+    #ifdef _WIN32
+        printf("windows\n");
+    #else
+        printf("not windows\n");
+    #endif
+
+    printf("%d\n", seconds);
+    printf("%d\n", truncated);
+    printf("%d\n", remainder);
+    printf("%d\n", shifted);
+    printf("%d\n", grouped);
+    return 0;
+}
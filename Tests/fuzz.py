@@ -0,0 +1,473 @@
+import hashlib
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+import traceback
+from multiprocessing import Pool
+
+# Grammar-based fuzzer for the translator.
+# Usage: python fuzz.py [-j workers] [--seconds 60] [--seed 1] [--budget-ms 10] [--gcc-every 10]
+#                       [--mutate 0.3] [--corpus dir]
+#
+# Each worker generates C+ programs from the constructs the translator supports and translates them in-process.
+# It records three kinds of findings:
+#   exception  the translator raised, or swallowed an exception and printed it
+#   slow       one line took longer than the budget to translate
+#   gcc        gcc -fsyntax-only rejects the C for an unmutated (valid) program
+# Every new finding is minimised and saved to the corpus directory as <kind>-<hash>.cpx.
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(TESTS_DIR), "Compiler"))
+
+import compiler
+
+# Diagnostic codes the translator reports when it swallows an exception
+EXCEPTION_CODES = ["E101", "E102", "W101"]
+
+
+class Generator:
+    # Random C+ programs. Names are declared before use and types line up,
+    # so gcc rejecting an unmutated program points at the translator.
+    def __init__(self, rng):
+        self.rng = rng
+        self.counter = 0
+        self.scopes = []
+        self.functions = []
+        self.structs = []
+        self.lines = []
+        self.depth = 0
+
+    def fresh(self, prefix):
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def emit(self, text):
+        self.lines.append("    " * self.depth + text)
+
+    def declare(self, name, kind, mutable=True):
+        self.scopes[-1].append((name, kind, mutable))
+
+    def variables(self, kinds, mutable=False):
+        return [name for scope in self.scopes for name, kind, canAssign in scope
+                if kind in kinds and (canAssign or not mutable)]
+
+    def integer(self, depth=0):
+        rng = self.rng
+        names = self.variables(["int", "long"])
+        pointers = self.variables(["pointer"])
+        arrays = [name for scope in self.scopes for name, kind, _ in scope if kind.startswith("array")]
+        choice = rng.random()
+        if depth > 2 or choice < 0.3:
+            return str(rng.randrange(0, 100))
+        if choice < 0.55 and names:
+            return rng.choice(names)
+        if choice < 0.6 and pointers:
+            return "*" + rng.choice(pointers)
+        if choice < 0.65 and arrays:
+            name = rng.choice(arrays)
+            return f"{name}[{rng.randrange(int(name.split('_')[-1]))}]"
+        if choice < 0.75:
+            return f"(({self.integer(depth + 1)}) % {rng.randrange(1, 10)})"
+        return f"({self.integer(depth + 1)} {rng.choice(['+', '-', '*', '&', '|', '^'])} {self.integer(depth + 1)})"
+
+    def floating(self, depth=0):
+        rng = self.rng
+        names = self.variables(["double", "float"])
+        choice = rng.random()
+        if depth > 2 or choice < 0.3:
+            return f"{rng.randrange(0, 100)}.{rng.randrange(0, 100)}"
+        if choice < 0.6 and names:
+            return rng.choice(names)
+        if choice < 0.7:
+            return f"({self.floating(depth + 1)}) / {rng.randrange(1, 10)}.5"
+        return f"({self.floating(depth + 1)} {rng.choice(['+', '-', '*'])} {self.integer(depth + 1)})"
+
+    def condition(self):
+        rng = self.rng
+        text = f"{self.integer()} {rng.choice(['<', '>', '==', '!=', '<=', '>='])} {self.integer()}"
+        if rng.random() < 0.2:
+            text += f" && {self.integer()} < {self.integer()}"
+        return text
+
+    def text(self):
+        return self.rng.choice(["hello", "a b c", "value", "x = ", "done.", "tab\\t", "100%"])
+
+    def statement(self):
+        rng = self.rng
+        choice = rng.randrange(20)
+        blocks = self.depth < 3
+
+        if choice == 0:
+            name = self.fresh("i")
+            const = rng.random() < 0.2
+            self.emit(f"let {name}: int{'; const' if const else ''} = {self.integer()}")
+            self.declare(name, "int", not const)
+        elif choice == 1:
+            name = self.fresh("l")
+            self.emit(f"let {name}: int; {rng.choice(['long', 'long long', 'unsigned; long'])} = {self.integer()}")
+            self.declare(name, "long")
+        elif choice == 2:
+            name = self.fresh("d")
+            vartype = rng.choice(["double", "float"])
+            self.emit(f"let {name}: {vartype} = {self.floating()}")
+            self.declare(name, vartype)
+        elif choice == 3:
+            name = self.fresh("s")
+            self.emit(rng.choice([f'let {name}: string = "{self.text()}"', f"let {name}: string"]))
+            self.declare(name, "string")
+        elif choice == 4:
+            size = rng.randrange(1, 40)
+            name = self.fresh("a") + f"_{size}"
+            initialiser = "{" + ", ".join(str(rng.randrange(100)) for _ in range(rng.randrange(1, min(size, 4) + 1))) + "}"
+            value = rng.choice(["", " = 0", f" = {initialiser}"])
+            self.emit(f"let {name}: int[{size}]{value}")
+            self.declare(name, f"array {size}")
+        elif choice == 5 and self.variables(["int"]):
+            name = self.fresh("p")
+            self.emit(f"let* {name}: int{rng.choice(['', '; restrict', '; const'])} = {rng.choice(self.variables(['int']))}")
+            self.declare(name, "pointer")
+        elif choice in [6, 7] and self.variables(["int", "long", "double", "float"], True):
+            target = rng.choice(self.variables(["int", "long", "double", "float"], True))
+            value = self.floating() if target.startswith("d") else self.integer()
+            self.emit(f"{target} {rng.choice(['=', '+=', '-='])} {value}")
+        elif choice == 8 and self.variables(["string"]):
+            target = rng.choice(self.variables(["string"]))
+            others = self.variables(["string"])
+            self.emit(rng.choice([f'cp_str_append_cstr(&{target}, "{self.text()}")',
+                                  f"cp_str_append(&{target}, {rng.choice(others)})"]))
+        elif choice in [9, 10]:
+            self.printStatement()
+        elif choice == 11 and blocks:
+            self.block(rng.choice(["if {} {{", "if ({}) {{"]).format(self.condition()))
+            if rng.random() < 0.4:
+                self.depth -= 1
+                self.emit("} else {")
+                self.depth += 1
+                self.scopes[-1] = []
+                self.statement()
+            self.close()
+        elif choice == 12 and blocks:
+            counter = self.fresh("k")
+            self.emit(f"let {counter}: int = 0")
+            self.declare(counter, "int", False)
+            self.block(f"while {counter} < {rng.randrange(1, 5)} {{")
+            self.emit(f"{counter} += 1")
+            self.close()
+        elif choice == 13 and blocks:
+            index = self.fresh("n")
+            low, high = rng.randrange(0, 5), rng.choice([str(rng.randrange(0, 20)), self.integer(2)])
+            step = rng.choice(["", "", f" step {rng.randrange(1, 4)}"])
+            self.block(f"for {index} in {rng.choice(['', 'reverse '])}{low}..{high}{step} {{", [(index, "int", False)])
+            self.close()
+        elif choice == 14:
+            self.emit(rng.choice([f"// {self.text()}", f"/* {self.text()} */"]))
+        elif choice == 15 and self.functions:
+            name, parameters = rng.choice(self.functions)
+            arguments = ", ".join(self.integer() if kind == "int" else self.floating() for kind in parameters)
+            result = self.fresh("r")
+            self.emit(f"let {result}: int = {name}({arguments})")
+            self.declare(result, "int")
+        elif choice == 16 and self.structs:
+            structName, fields = rng.choice(self.structs)
+            name = self.fresh("v")
+            self.emit(f"let {name}: {structName}")
+            self.declare(name, "struct")
+            for field, kind in fields:
+                if kind != "char":
+                    self.emit(f"{name}.{field} = {self.integer() if kind == 'int' else self.floating()}")
+        else:
+            self.emit(f"{self.integer()}")
+
+    def printStatement(self):
+        rng = self.rng
+        names = self.variables(["int", "long", "double", "float", "string"])
+        choice = rng.randrange(4)
+        if choice == 0 and names:
+            self.emit(f"print({rng.choice(names)})")
+        elif choice == 1 and names:
+            self.emit(f'print("{self.text()} {{{rng.choice(names)}}} {self.text()}")')
+        elif choice == 2 and self.variables(["string"]):
+            self.emit(f'print("{self.text()}" + {rng.choice(self.variables(["string"]))} + "\\n")')
+        else:
+            self.emit(f'print("{self.text()}\\n")')
+
+    def block(self, header, declarations=()):
+        self.emit(header)
+        self.depth += 1
+        self.scopes.append(list(declarations))
+        for _ in range(self.rng.randrange(1, 4)):
+            self.statement()
+
+    def close(self):
+        self.scopes.pop()
+        self.depth -= 1
+        self.emit("}")
+
+    def function(self):
+        rng = self.rng
+        name = self.fresh("helper")
+        parameters = [rng.choice(["int", "double"]) for _ in range(rng.randrange(0, 3))]
+        names = [self.fresh("arg") for _ in parameters]
+        modifier = rng.choice(["", "", "inline ", "static ", "static inline "])
+        signature = ", ".join(f"{n}: {kind}" for n, kind in zip(names, parameters))
+        self.emit(f"{modifier}fn {name}({signature}) -> int {{")
+        self.depth += 1
+        self.scopes.append([(n, kind, True) for n, kind in zip(names, parameters)])
+        for _ in range(rng.randrange(1, 5)):
+            self.statement()
+        self.emit(f"return {self.integer()}")
+        self.close()
+        self.functions.append((name, parameters))
+
+    def struct(self):
+        rng = self.rng
+        name = self.fresh("Record")
+        fields = [(self.fresh("f"), rng.choice(["int", "double", "char"])) for _ in range(rng.randrange(1, 5))]
+        self.emit(f"struct {rng.choice(['', '', 'packed ', 'ordered '])}{name} {{")
+        for field, kind in fields:
+            self.emit(f"    {field}: {kind}")
+        self.emit("}")
+        self.structs.append((name, fields))
+
+    def program(self):
+        self.lines = ["import stdio", "import stdlib", "import string", ""]
+        self.scopes = [[]]
+        for _ in range(self.rng.randrange(0, 3)):
+            self.struct()
+        for _ in range(self.rng.randrange(0, 3)):
+            self.function()
+        self.emit("fn main() -> int {")
+        self.depth += 1
+        self.scopes.append([])
+        for _ in range(self.rng.randrange(3, 25)):
+            self.statement()
+        self.emit("return 0")
+        self.close()
+        return self.lines
+
+
+def mutate(lines, rng):
+    # Breaks a few lines at the token level, to reach the malformed-input paths
+    lines = list(lines)
+    for _ in range(rng.randrange(1, 4)):
+        i = rng.randrange(len(lines))
+        tokens = compiler.regexEngine(lines[i]) or [""]
+        j = rng.randrange(len(tokens))
+        choice = rng.randrange(6)
+        if choice == 0:
+            del tokens[j]
+        elif choice == 1:
+            tokens.insert(j, tokens[j])
+        elif choice == 2:
+            tokens = tokens[:j]
+        elif choice == 3:
+            tokens.insert(j, rng.choice(["(", ")", "{", "}", ":", ";", "=", "*", "->", '"', "'", "..", "let", "fn", "[", "]", "/*", "*/"]))
+        elif choice == 4 and len(tokens) > 1:
+            k = rng.randrange(len(tokens))
+            tokens[j], tokens[k] = tokens[k], tokens[j]
+        else:
+            tokens[j] = rng.choice(["let", "let*", "fn", "print", "import", "for", "while", "if", "struct", "string", "int"])
+        lines[i] = "".join(tokens)
+    return lines
+
+def translate(lines):
+    # (C source, per-line times, exception message or None) for a program
+    times = []
+    compiler.diagnostics.clear("fuzz.cpx")
+    try:
+        output, _ = compiler.translateLines(lines, "fuzz.cpx", hostBuild=False, lineTimes=times)
+        exception = None
+    except Exception as e:
+        output = []
+        frame = traceback.extract_tb(e.__traceback__)[-1]
+        exception = f"{type(e).__name__} in {frame.name}: {e}"
+
+    if exception is None:
+        for record in compiler.diagnostics.records:
+            if record.code in EXCEPTION_CODES:
+                exception = f"{record.code} {record.message}"
+                break
+    return "".join(output), times, exception
+
+def gccErrors(cSource):
+    # First error gcc reports for the C, or None when it accepts it
+    result = subprocess.run(["gcc", "-fsyntax-only", "-fdiagnostics-color=never", "-x", "c", "-"] + compiler.gccFlags([]),
+                            input=cSource, capture_output=True, text=True)
+    for line in result.stderr.splitlines():
+        if ": error: " in line:
+            return line.split(": error: ", 1)[1]
+    return None if result.returncode == 0 else result.stderr.strip()[:200]
+
+def normalise(message):
+    # Signature of a message: generated names differ only in their numbers between programs hitting the same bug
+    return re.sub(r"\d+", "N", message)
+
+def slowSignature(lines, times, budget):
+    # Signature of the slowest line when it is over budget: the construct it starts with, or None
+    if not times:
+        return None
+    n, seconds = max(times, key=lambda t: t[1])
+    if seconds <= budget:
+        return None
+    words = lines[n - 1].split()
+    return "slow " + (words[0] if words else "blank line")
+
+def check(lines, kind, budget):
+    # Signature of the finding of the given kind for these lines, or None
+    cSource, times, exception = translate(lines)
+    if kind == "exception":
+        return None if exception is None else normalise(exception)
+    if kind == "slow":
+        # Timing is noisy, so a line has to be slow three times in a row
+        signature = slowSignature(lines, times, budget)
+        for _ in range(2):
+            if signature is None:
+                break
+            _, again, _ = translate(lines)
+            signature = signature if slowSignature(lines, again, budget) == signature else None
+        return signature
+    if exception is not None:
+        return None
+    error = gccErrors(cSource)
+    return None if error is None else normalise(error)
+
+def minimise(lines, kind, signature, budget, attempts):
+    # Delta debugging over lines, then over the tokens of each remaining line, keeping the same signature
+    def reproduces(candidate):
+        nonlocal attempts
+        if attempts <= 0:
+            return False
+        attempts -= 1
+        return check(candidate, kind, budget) == signature
+
+    chunks = 2
+    while len(lines) >= 2:
+        size = max(1, len(lines) // chunks)
+        for start in range(0, len(lines), size):
+            candidate = lines[:start] + lines[start + size:]
+            if candidate and reproduces(candidate):
+                lines = candidate
+                chunks = max(chunks - 1, 2)
+                break
+        else:
+            if size == 1:
+                break
+            chunks = min(chunks * 2, len(lines))
+
+    for i in range(len(lines)):
+        tokens = compiler.regexEngine(lines[i])
+        j = 0
+        while j < len(tokens):
+            if tokens[j].isspace():
+                j += 1
+                continue
+            candidate = tokens[:j] + tokens[j + 1:]
+            if reproduces(lines[:i] + ["".join(candidate)] + lines[i + 1:]):
+                tokens = candidate
+            else:
+                j += 1
+        lines[i] = "".join(tokens)
+    return lines
+
+def fuzzWorker(job):
+    # Runs until the deadline, returns (stats, findings) with findings as (kind, signature, reproducer lines, detail)
+    seed, seconds, budget, gccEvery, mutateRate, attempts = job
+    rng = random.Random(seed)
+    deadline = time.perf_counter() + seconds
+    stats = {"programs": 0, "lines": 0, "gcc": 0, "translateTime": 0.0}
+    findings = {}
+
+    while time.perf_counter() < deadline:
+        lines = Generator(rng).program()
+        mutated = rng.random() < mutateRate
+        if mutated:
+            lines = mutate(lines, rng)
+
+        start = time.perf_counter()
+        cSource, times, exception = translate(lines)
+        stats["translateTime"] += time.perf_counter() - start
+        stats["programs"] += 1
+        stats["lines"] += len(lines)
+
+        found = []
+        if exception is not None:
+            found.append(("exception", normalise(exception), exception))
+        slow = slowSignature(lines, times, budget)
+        if slow is not None:
+            n, seconds = max(times, key=lambda t: t[1])
+            found.append(("slow", slow, f"line {n} took {seconds * 1000:.1f}ms: {lines[n - 1].strip()}"))
+        if exception is None and not mutated and stats["programs"] % gccEvery == 0:
+            stats["gcc"] += 1
+            error = gccErrors(cSource)
+            if error is not None:
+                found.append(("gcc", normalise(error), error))
+
+        for kind, signature, detail in found:
+            if (kind, signature) in findings:
+                continue
+            if check(lines, kind, budget) != signature:
+                continue  # flaky, e.g. a slow line that was only slow once
+            reproducer = minimise(list(lines), kind, signature, budget, attempts)
+            findings[(kind, signature)] = (kind, signature, reproducer, detail)
+
+    return stats, list(findings.values())
+
+def saveFinding(corpus, kind, signature, reproducer, detail):
+    # Writes a reproducer unless one with the same signature is already in the corpus; returns its path or None
+    name = f"{kind}-{hashlib.sha1((kind + signature).encode()).hexdigest()[:10]}.cpx"
+    path = os.path.join(corpus, name)
+    if os.path.exists(path):
+        return None
+    os.makedirs(corpus, exist_ok=True)
+    with open(path, "w") as f:
+        f.write(f"// {kind}: {detail}\n// signature: {signature}\n")
+        f.write("\n".join(reproducer) + "\n")
+    return path
+
+def main():
+    args = sys.argv[1:]
+    workers = int(compiler.getArgValue(args, "-j", os.cpu_count() or 1))
+    seconds = float(compiler.getArgValue(args, "--seconds", 60))
+    seed = int(compiler.getArgValue(args, "--seed", int(time.time())))
+    budget = float(compiler.getArgValue(args, "--budget-ms", 10)) / 1000
+    gccEvery = int(compiler.getArgValue(args, "--gcc-every", 10))
+    mutateRate = float(compiler.getArgValue(args, "--mutate", 0.3))
+    attempts = int(compiler.getArgValue(args, "--max-attempts", 300))
+    corpus = compiler.getArgValue(args, "--corpus", os.path.join(TESTS_DIR, "fuzz"))
+
+    print(f"[Info] Fuzzing on {workers} workers for {seconds:.0f}s (seed {seed})")
+    jobs = [(seed + i, seconds, budget, gccEvery, mutateRate, attempts) for i in range(workers)]
+    start = time.perf_counter()
+    with Pool(workers) as pool:
+        results = pool.map(fuzzWorker, jobs)
+    elapsed = time.perf_counter() - start
+
+    totals = {"programs": 0, "lines": 0, "gcc": 0, "translateTime": 0.0}
+    findings = {}
+    for stats, workerFindings in results:
+        for key in totals:
+            totals[key] += stats[key]
+        for kind, signature, reproducer, detail in workerFindings:
+            # Keep the smallest reproducer of each signature
+            previous = findings.get((kind, signature))
+            if previous is None or len(reproducer) < len(previous[2]):
+                findings[(kind, signature)] = (kind, signature, reproducer, detail)
+
+    print(f"[Info] {totals['programs']} programs, {totals['lines']} lines, {totals['gcc']} gcc checks in {elapsed:.1f}s")
+    print(f"    {totals['programs'] / elapsed:,.0f} programs/s, {totals['lines'] / elapsed:,.0f} lines/s overall")
+    if totals["translateTime"] > 0:
+        print(f"    {totals['lines'] / totals['translateTime']:,.0f} lines/s per worker in the translator")
+
+    for kind, signature, reproducer, detail in sorted(findings.values()):
+        path = saveFinding(corpus, kind, signature, reproducer, detail)
+        status = f"saved {os.path.relpath(path)}" if path is not None else "already in corpus"
+        print(f"[Warning] {kind}: {detail} ({len(reproducer)} lines, {status})")
+    if not findings:
+        print("[Info] No findings")
+
+
+if __name__ == "__main__":
+    main()
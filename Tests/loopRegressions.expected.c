@@ -0,0 +1,19 @@
+#include <stdio.h>
+
+
+int main() {
+    int n = 5;
+    int total = 0;
+
+
+    for (int cp_top_i = n * 2, i = cp_top_i - 1; i >= 0; i -= 3) {
+        printf("%d\n", i);
+    }
+
+
+    for (int j = 0; j < 010; j++) {
+        total = total + j;
+    }
+    printf("%d\n", total);
+    return 0;
+}
@@ -0,0 +1,11 @@
+#include <stdio.h>
+#include <math.h>
+
+
+int main() {
+    double g = tgamma(5.0);
+    double r = M_SQRT2 * M_SQRT2;
+    printf("%f\n", g);
+    printf("%f\n", r);
+    return 0;
+}
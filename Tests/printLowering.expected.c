@@ -0,0 +1,57 @@
+#include "cplus.h"
+#line 1 "printLowering.cpx"
+#include <stdio.h>
+
+typedef struct Point {
+#line 5 "printLowering.cpx"
+    double z;
+    cp_string label;
+    struct Point *next;
+#line 4 "printLowering.cpx"
+    int x;
+#line 8 "printLowering.cpx"
+} Point;
+
+long twice(int n) {
+    return n * 2;
+}
+
+int main() {
+    int i = 3;
+    long l = 40000000000;
+    unsigned int u = 7;
+    char c = 'x';
+    double d = 1.5;
+    cp_string name = cp_str_lit("C+");
+
+
+    printf("Hello, %.*s!\n", (int)name.len, name.data);
+    printf("i is %d, c is %c, 100%% sure, {braces}\n", i, c);
+
+
+    printf("%d\n", i);
+    printf("%ld\n", l + i);
+    printf("%u\n", u + i);
+    printf("%f\n", d * i);
+    printf("%d\n", i < l);
+    printf("%ld\n", twice(i));
+    printf("%zu\n", name.len);
+    printf("42\n");
+
+
+    Point p;
+    p.x = 2;
+    p.z = 0.5;
+    p.label = cp_str_lit("origin");
+    p.next = &p;
+    cp_string words[2] = {cp_str_lit("one"), cp_str_lit("two")};
+    printf("%f\n", p.z);
+    printf("%d\n", p.next->x);
+    printf("%.*s has %zu letters\n", (int)p.label.len, p.label.data, p.label.len);
+    printf("%zu\n", sizeof(p));
+    printf("%.*s %zu\n", (int)words[1].len, words[1].data, words[0].len);
+
+
+    printf("%d-%d\n", i, i);
+    return 0;
+}
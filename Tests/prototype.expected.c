@@ -0,0 +1,16 @@
+#include <stdio.h>
+
+
+int helper(int x);
+
+double x = 2.5;
+
+int main() {
+    printf("%f\n", x);
+    printf("%d\n", helper(3));
+    return 0;
+}
+
+int helper(int x) {
+    return x * 2;
+}
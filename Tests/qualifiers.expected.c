@@ -0,0 +1,33 @@
+#include <stdio.h>
+
+static inline float dot(const float *restrict a, const float *restrict b, int n) {
+    float total = 0;
+    for (int i = 0; i < n; i++) {
+        total = total + a[i] * b[i];
+    }
+    return total;
+}
+
+static int half(int x) {
+    return x / 2;
+}
+
+static inline int square(int x) {
+    return x * x;
+}
+
+int main() {
+    const int limit = 4;
+    volatile int counter = 0;
+    float a[4] = {1, 2, 3, 4};
+    float b[4] = {4, 3, 2, 1};
+    float *restrict p = a;
+
+    counter = counter + 1;
+    p[0] = 2;
+    printf("%f\n", dot(a, b, limit));
+    printf("%d\n", half(limit));
+    printf("%d\n", square(limit));
+    printf("%d\n", counter);
+    return 0;
+}
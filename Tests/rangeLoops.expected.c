@@ -0,0 +1,40 @@
+#include <stdio.h>
+
+int main() {
+    int n = 5;
+    unsigned long long big = 3;
+    int total = 0;
+
+    for (int i = 0; i < n; i++) {
+        total = total + i;
+    }
+    for (int i = 0; i < n; i += 2) {
+        printf("%d\n", i);
+    }
+    for (int i = n; i-- > 0; ) {
+        printf("%d\n", i);
+    }
+    for (unsigned long long k = 0; k < big; k++) {
+        total = total + 1;
+    }
+
+
+    int j = 0;
+    while (j < 3) {
+        j = j + 1;
+    }
+    do {
+        j = j - 1;
+    } while (j > 0);
+
+    if (total > 10) {
+        printf("big\n");
+    } else if (total > 5) {
+        printf("medium\n");
+    } else {
+        printf("small\n");
+    }
+    printf("%d\n", total);
+    printf("%d\n", j);
+    return 0;
+}
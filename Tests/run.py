@@ -0,0 +1,255 @@
+import difflib
+import hashlib
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# Golden-output tests for the translator and the programs it generates.
+# Usage: python run.py [dir or name filter ...] [-j workers] [--timeout seconds] [--top 10] [--update] [--no-cache] [-O0..-O3]
+#
+# Every .cpx file under the test directory is a case. Next to it:
+#   name.expected.c    the C it must translate to
+#   name.expected.out  what the built program must print (name.in is fed to stdin if it exists)
+# A case can ask for translator and gcc flags on its first line: // cpx: --checked --no-fold -l -O2 -fsanitize=address
+# --update writes both from the current output (the .out only when the program builds and exits 0).
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILER_DIR = os.path.join(os.path.dirname(TESTS_DIR), "Compiler")
+sys.path.insert(0, COMPILER_DIR)
+
+import compiler
+
+CACHE_DIR = os.path.join(TESTS_DIR, ".cpx_cache", "tests")
+
+
+class CaseTimeout(Exception):
+    pass
+
+
+def compilerDigest():
+    # Hash of the translator and runtime sources: a cached translation is only valid for the same compiler
+    digest = hashlib.sha256()
+    for path in [os.path.join(COMPILER_DIR, "compiler.py"), os.path.join(compiler.RUNTIME_DIR, "cplus.h")]:
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def discoverCases(paths, filters):
+    # (cpx path, expected C path or None, expected stdout path or None, stdin path or None) for every case
+    cases = []
+    for root in paths:
+        for directory, dirs, files in os.walk(root):
+            # fuzz/ holds the fuzzer's reproducers, they have no expected output
+            dirs[:] = sorted(d for d in dirs if not d.startswith(".") and d != "fuzz")
+            for name in sorted(files):
+                if not name.endswith(".cpx"):
+                    continue
+                path = os.path.join(directory, name)
+                if filters and not any(f in path for f in filters):
+                    continue
+                stem = path[:-4]
+                cases.append((path,
+                              stem + ".expected.c" if os.path.exists(stem + ".expected.c") else None,
+                              stem + ".expected.out" if os.path.exists(stem + ".expected.out") else None,
+                              stem + ".in" if os.path.exists(stem + ".in") else None))
+    return cases
+
+def caseFlags(path):
+    # Flags from a "// cpx: ..." first line, [] when there is none
+    with open(path, "r") as f:
+        match = re.match(r"\s*//\s*cpx:(.*)", f.readline())
+    return match.group(1).split() if match else []
+
+def readText(path):
+    with open(path, "r") as f:
+        return f.read()
+
+def difference(expected, actual, label):
+    lines = difflib.unified_diff(expected.splitlines(keepends=True), actual.splitlines(keepends=True),
+                                 f"expected {label}", f"actual {label}")
+    return "".join(list(lines)[:40])
+
+def alarm(signum, frame):
+    raise CaseTimeout()
+
+def translateCase(path, workDir, digest, useCache, flags):
+    # C for a case, from the cache when neither the case nor the compiler changed since it was stored.
+    # The flags come from the case's first line, so they are part of the cache key already.
+    with open(path, "rb") as f:
+        key = hashlib.sha256(digest.encode() + os.path.basename(path).encode() + f.read()).hexdigest()[:24]
+    cachePath = os.path.join(CACHE_DIR, key + ".c")
+    if useCache and os.path.exists(cachePath):
+        return readText(cachePath), "", True
+
+    cPath = os.path.join(workDir, os.path.basename(path)[:-3] + "c")
+    # Portable output (platform checks kept) so goldens don't depend on the machine running the tests
+    result = compiler.translateFile(path, cPath, "-l" in flags, "--no-fold" not in flags, hostBuild=False,
+                                    checked="--checked" in flags)
+    messages = compiler.diagnostics.render()
+    if result is None:
+        raise RuntimeError(f"could not read the case\n{messages}")
+    cSource = readText(cPath)
+
+    if useCache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temporary = f"{cachePath}.{os.getpid()}"
+        with open(temporary, "w") as f:
+            f.write(cSource)
+        os.replace(temporary, cachePath)  # atomic, other workers may be storing the same key
+    return cSource, messages, False
+
+def buildCase(path, cSource, workDir, optFlags, useCache, timeout):
+    # (executable path, None) or (None, gcc errors); executables are cached by their C source and flags
+    flags = compiler.gccFlags(optFlags, ["-O0"]) + [flag for flag in optFlags if flag.startswith("-f")]
+    key = hashlib.sha256(cSource.encode() + " ".join(flags).encode()).hexdigest()[:24]
+    cachedPath = compiler.executablePath(os.path.join(CACHE_DIR, key + ".c"))
+    if useCache and os.path.exists(cachedPath):
+        return cachedPath, None
+
+    cPath = os.path.join(workDir, os.path.basename(path)[:-3] + "c")
+    with open(cPath, "w") as f:
+        f.write(cSource)
+    exePath = compiler.executablePath(cPath)
+    build = subprocess.run(["gcc", cPath, "-o", exePath] + flags, capture_output=True, text=True, timeout=timeout)
+    if build.returncode != 0:
+        return None, build.stderr
+
+    if useCache:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temporary = f"{cachedPath}.{os.getpid()}"
+        shutil.copy2(exePath, temporary)
+        os.replace(temporary, cachedPath)
+    return exePath, None
+
+def runCase(case, options):
+    # Runs one case in a pool worker; returns (path, status, detail, timings)
+    path, expectedC, expectedOut, stdinPath = case
+    timeout, update, useCache, digest, optFlags = options
+    timings = {}
+    deadline = time.perf_counter() + timeout
+
+    def remaining():
+        left = deadline - time.perf_counter()
+        if left <= 0:
+            raise CaseTimeout()
+        return left
+
+    workDir = tempfile.mkdtemp(prefix="cpx-test-")
+    try:
+        flags = caseFlags(path)
+        # The translator runs in this process, so it is interrupted with a timer where the platform has one
+        if hasattr(signal, "setitimer"):
+            signal.signal(signal.SIGALRM, alarm)
+            signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            start = time.perf_counter()
+            cSource, messages, cached = translateCase(path, workDir, digest, useCache, flags)
+            timings["cached translation" if cached else "translate"] = time.perf_counter() - start
+        finally:
+            if hasattr(signal, "setitimer"):
+                signal.setitimer(signal.ITIMER_REAL, 0)
+
+        failures = []
+        if update:
+            with open(path[:-4] + ".expected.c", "w") as f:
+                f.write(cSource)
+        elif expectedC is not None and readText(expectedC) != cSource:
+            failures.append(difference(readText(expectedC), cSource, "C"))
+
+        if expectedOut is not None or update:
+            start = time.perf_counter()
+            # -O levels on the command line win over the case's own; -f flags (e.g. -fsanitize=address) are kept
+            exePath, error = buildCase(path, cSource, workDir, flags + optFlags, useCache, remaining())
+            timings["gcc" if error is not None or not exePath.startswith(CACHE_DIR) else "cached build"] = \
+                time.perf_counter() - start
+            if error is not None:
+                if not update:
+                    failures.append(f"gcc failed:\n{error}")
+            else:
+                start = time.perf_counter()
+                if stdinPath is not None:
+                    with open(stdinPath, "r") as stdin:
+                        process = subprocess.run([exePath], stdin=stdin, capture_output=True, text=True, timeout=remaining())
+                else:
+                    process = subprocess.run([exePath], stdin=subprocess.DEVNULL, capture_output=True, text=True,
+                                             timeout=remaining())
+                timings["run"] = time.perf_counter() - start
+
+                if update and process.returncode == 0:
+                    with open(path[:-4] + ".expected.out", "w") as f:
+                        f.write(process.stdout)
+                elif not update and process.stdout != readText(expectedOut):
+                    failures.append(difference(readText(expectedOut), process.stdout, "stdout"))
+
+        if update:
+            return path, "updated", "", timings
+        if expectedC is None and expectedOut is None:
+            return path, "skipped", "no .expected.c or .expected.out", timings
+        if failures:
+            return path, "failed", "\n".join(failures + ([messages] if messages else [])), timings
+        return path, "passed", "", timings
+
+    except (CaseTimeout, subprocess.TimeoutExpired):
+        return path, "timeout", f"exceeded {timeout}s", timings
+    except Exception as e:
+        return path, "failed", f"{type(e).__name__}: {e}", timings
+    finally:
+        shutil.rmtree(workDir, ignore_errors=True)
+
+def main():
+    args = sys.argv[1:]
+    workers = int(compiler.getArgValue(args, "-j", os.cpu_count() or 1))
+    timeout = float(compiler.getArgValue(args, "--timeout", 10))
+    top = int(compiler.getArgValue(args, "--top", 10))
+    update = "--update" in args
+    useCache = "--no-cache" not in args
+    optFlags = [arg for arg in args if arg.startswith("-O")]
+
+    # Remaining arguments are directories to search or substrings of case paths to run
+    valued = {compiler.getArgValue(args, flag) for flag in ["-j", "--timeout", "--top"] if flag in args}
+    positional = [arg for arg in args if not arg.startswith("-") and arg not in valued]
+    paths = [arg for arg in positional if os.path.isdir(arg)] or [TESTS_DIR]
+    filters = [arg for arg in positional if not os.path.isdir(arg)]
+
+    cases = discoverCases(paths, filters)
+    if not cases:
+        print("[Error] No .cpx test cases found")
+        sys.exit(1)
+
+    options = (timeout, update, useCache, compilerDigest(), optFlags)
+    results = []
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(runCase, case, options) for case in cases]
+        for future in as_completed(futures):
+            path, status, detail, timings = future.result()
+            results.append((path, status, detail, timings))
+            if status in ["failed", "timeout"]:
+                print(f"[Error] {os.path.relpath(path)}: {status}\n{detail}")
+    elapsed = time.perf_counter() - start
+
+    counts = {}
+    for _, status, _, _ in results:
+        counts[status] = counts.get(status, 0) + 1
+    summary = ", ".join(f"{count} {status}" for status, count in sorted(counts.items()))
+    print(f"[Info] {len(results)} cases in {elapsed:.2f}s on {workers} workers: {summary}")
+
+    slowest = sorted(results, key=lambda result: sum(result[3].values()), reverse=True)[:top]
+    if slowest:
+        print(f"[Info] Slowest {len(slowest)} cases:")
+        for path, status, _, timings in slowest:
+            parts = "  ".join(f"{stage} {seconds * 1000:.0f}ms" for stage, seconds in timings.items())
+            print(f"    {sum(timings.values()) * 1000:7.0f}ms  {os.path.relpath(path)}  ({parts})")
+
+    if counts.get("failed") or counts.get("timeout"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
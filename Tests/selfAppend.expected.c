@@ -0,0 +1,23 @@
+#include "cplus.h"
+#line 1 "selfAppend.cpx"
+
+#include <stdio.h>
+
+int main() {
+    cp_string s = cp_str_lit("abc");
+
+
+    for (int i = 0; i < 5; i++) {
+        cp_str_append(&s, s);
+    }
+    printf("%zu\n", s.len);
+
+    cp_str_view view = cp_str_slice(s, 1, 4);
+    for (int i = 0; i < 40; i++) {
+        cp_str_append_view(&s, view);
+        view = cp_str_slice(s, s.len - 3, s.len);
+    }
+    printf("%zu\n", s.len);
+    printf("%.*s\n", (int)s.len, s.data);
+    return 0;
+}
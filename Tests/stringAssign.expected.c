@@ -0,0 +1,39 @@
+#include "cplus.h"
+#line 1 "stringAssign.cpx"
+#include <stdio.h>
+#include <string.h>
+
+cp_string greeting() {
+    return cp_str_lit("hello");
+}
+
+int main() {
+    cp_string names[3];
+    names[0] = cp_str_lit("ada");
+    names[1] = cp_str_lit("grace");
+    names[2] = cp_str_copy(names[0]);
+
+
+    cp_str_append_cstr(&names[2], " lovelace");
+    for (int i = 0; i < 3; i++) {
+        printf("%.*s\n", (int)names[i].len, names[i].data);
+    }
+    printf("%c\n", names[1].data[0]);
+
+    cp_string s = cp_str_lit("first");
+    cp_string t = cp_str_copy(s);
+    s = cp_str_lit("second");
+    t = cp_str_copy(s);
+    cp_str_append_cstr(&s, "!");
+    printf("%.*s %.*s\n", (int)s.len, s.data, (int)t.len, t.data);
+
+    char *cstr = "from C";
+    t = cp_str_from(cstr);
+    printf("%.*s\n", (int)t.len, t.data);
+    t = greeting();
+    printf("%.*s\n", (int)t.len, t.data);
+    t = cp_str_copy(names[1]);
+    size_t n = strlen(t.data) + strlen(names[2].data);
+    printf("%zu\n", n);
+    return 0;
+}
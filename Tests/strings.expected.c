@@ -0,0 +1,29 @@
+#include "cplus.h"
+#line 1 "strings.cpx"
+#include <stdio.h>
+#include <string.h>
+
+int greet(cp_string who) {
+    printf("Hello, %.*s\n", (int)who.len, who.data);
+    return (int)who.len;
+}
+
+int main() {
+    cp_string name = cp_str_lit("world");
+    cp_string copy = cp_str_copy(name);
+    _Alignas(32) char buffer[64];
+
+
+    int n = strlen(name.data);
+    char first = name.data[0];
+    char *found = strstr(name.data, "or");
+    sprintf(buffer, "%s has %d letters", name.data, n);
+    puts(buffer);
+    printf("%c\n", first);
+    puts(found);
+
+    cp_str_append(&copy, cp_str_lit("!"));
+    puts(cp_str_cstr(copy));
+    printf("%d\n", greet(copy));
+    return 0;
+}
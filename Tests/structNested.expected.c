@@ -0,0 +1,28 @@
+#include <stdio.h>
+
+#define N 4
+
+
+typedef struct P {
+    int n[N];
+    char flag;
+} P;
+
+
+typedef struct Q {
+    char tag;
+    struct P p;
+    int count;
+} Q;
+
+int main() {
+    Q q;
+    q.tag = 1;
+    q.count = 3;
+    q.p.n[N - 1] = 7;
+    int last = q.p.n[N - 1];
+    int count = q.count;
+    printf("%d\n", count);
+    printf("%d\n", last);
+    return 0;
+}
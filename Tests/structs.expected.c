@@ -0,0 +1,43 @@
+#include <stdio.h>
+
+
+typedef struct Node {
+#line 6 "structs.cpx"
+    double value;
+    struct Node *next;
+    int count;
+#line 5 "structs.cpx"
+    char flag;
+#line 9 "structs.cpx"
+} Node;
+
+
+typedef struct __attribute__((packed)) Header {
+    char tag;
+    int size;
+} Header;
+
+typedef struct Pair {
+    char a;
+    long b;
+} Pair;
+
+int main() {
+    Node first;
+    Node second;
+    first.flag = 'a';
+    first.value = 2.5;
+    first.count = 1;
+    first.next = &second;
+    second.count = 2;
+
+    int nodeSize = sizeof(Node);
+    int headerSize = sizeof(Header);
+    int pairSize = sizeof(Pair);
+    int linked = first.next->count;
+    printf("%d\n", nodeSize);
+    printf("%d\n", headerSize);
+    printf("%d\n", pairSize);
+    printf("%d\n", linked);
+    return 0;
+}
@@ -0,0 +1,30 @@
+#include "cplus.h"
+#line 1 "test.cpx"
+#include <stdio.h>
+#include <stdlib.h>
+
+/*
+Multi Line Comment
+*/
+
+void test() {
+    printf("Functions Work.\n");
+}
+
+int main() {
+    printf("Hello, World!\n");
+
+    double a = 3.14159265358;
+    float b = 3.1415;
+    cp_string c = cp_str_lit("Hello");
+    char *d = c.data;
+    int e = 1;
+    int *f = &e;
+    unsigned int g1 = 3;
+    cp_string g2 = cp_str_lit("Hello");
+
+    test();
+
+    return 0;
+}
+
@@ -0,0 +1,22 @@
+#include "cplus.h"
+#line 1 "testUnsignedLong.cpx"
+#include <stdio.h>
+#include <stdlib.h>
+
+/*
+Multi Line Comment
+*/
+
+int main() {
+    printf("Hello, World!\n");
+
+    unsigned long long a = 4;
+    long long b = 4;
+    unsigned long c = 4;
+    long d = 4;
+
+    cp_string e = cp_str_lit("Hello");
+    cp_string f = cp_str_lit("Hello");
+
+    return 0;
+}
@@ -0,0 +1,23 @@
+const vscode = require("vscode");
+const { LanguageClient } = require("vscode-languageclient/node");
+
+let client;
+
+// Starts the C+ language server ("cpx lsp") for .cpx files
+function activate(context) {
+    const compilerPath = vscode.workspace.getConfiguration("cplus").get("compilerPath", "cpx");
+
+    client = new LanguageClient(
+        "cplus",
+        "C+ Language Server",
+        { command: compilerPath, args: ["lsp"] },
+        { documentSelector: [{ scheme: "file", language: "cplus" }] }
+    );
+    context.subscriptions.push(client.start());
+}
+
+function deactivate() {
+    return client ? client.stop() : undefined;
+}
+
+module.exports = { activate, deactivate };